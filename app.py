@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-Image Summarizer - Flask Web API
+Image Summarizer - Quart Web API
 
 Usage:
     python app.py
@@ -9,26 +9,116 @@ Usage:
 
 import asyncio
 import argparse
+import functools
+import gzip
 import json
+import mimetypes
 import os
+import re
+import shutil
 import sys
 from pathlib import Path
 from datetime import datetime
 import uuid
 
 try:
-    from flask import Flask, request, jsonify, render_template_string
-    from flask_cors import CORS
-    from werkzeug.utils import secure_filename
-    FLASK_AVAILABLE = True
+    from quart import Quart, Response, request, jsonify
+    from werkzeug.exceptions import RequestEntityTooLarge
+    QUART_AVAILABLE = True
 except ImportError:
-    FLASK_AVAILABLE = False
+    QUART_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
-from src.workflow import ImageSummarizer
-from src.config import load_config
+
+# Chunk size used when streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Number of reusable upload directories (caps concurrent jobs on disk)
+UPLOAD_SLOTS = 64
+
+# Upload limits, enforced before anything is written to disk
+MAX_IMAGE_BYTES = 50 * 1024 * 1024
+MAX_IMAGES_PER_REQUEST = 20
+
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+# Leading bytes of the image formats the providers accept
+_IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a')
+
+
+@functools.lru_cache(maxsize=2048)
+def fast_secure_filename(filename: str) -> str:
+    """Reduce an uploaded filename to a safe ASCII basename."""
+    name = _UNSAFE_FILENAME_CHARS.sub('_', filename).strip('._')[:255]
+    return name or 'file'
+
+
+def _upload_size(file) -> int:
+    """Size of an uploaded file, from its headers or its spooled stream."""
+    if file.content_length:
+        return file.content_length
+    stream = file.stream
+    position = stream.tell()
+    size = stream.seek(0, os.SEEK_END)
+    stream.seek(position)
+    return size
+
+
+def _is_image(file) -> bool:
+    """Whether an upload is an image, by its declared type, extension or content.
+    
+    Clients such as curl and requests send files without a specific type
+    (no Content-Type, or application/octet-stream), so those fall back to
+    the filename extension and then to the file signature.
+    """
+    mimetype = file.mimetype or ''
+    if mimetype.startswith('image/'):
+        return True
+    if mimetype not in ('', 'application/octet-stream'):
+        return False
+    if (mimetypes.guess_type(file.filename)[0] or '').startswith('image/'):
+        return True
+    stream = file.stream
+    position = stream.tell()
+    head = stream.read(12)
+    stream.seek(position)
+    return head.startswith(_IMAGE_SIGNATURES) or (head[:4] == b'RIFF' and head[8:12] == b'WEBP')
+
+
+def _save_upload(file, destination: str):
+    """Stream an uploaded file to disk in large chunks."""
+    with open(destination, 'wb', buffering=0) as out:
+        shutil.copyfileobj(file.stream, out, UPLOAD_CHUNK_SIZE)
+
+
+def _dump_json(data) -> bytes:
+    """Serialize data to JSON bytes, using orjson when installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data).encode('utf-8')
+
+
+async def _relay_events(events: asyncio.Queue):
+    """Format queued events as server-sent events until the None sentinel."""
+    while True:
+        event = await events.get()
+        if event is None:
+            break
+        yield b'data: ' + _dump_json(event) + b'\n\n'
+
+
+def _reset_slot(slot: Path):
+    """Empty an upload slot directory so it can be reused."""
+    shutil.rmtree(slot, ignore_errors=True)
+    slot.mkdir()
 
 
 # HTML template for web interface
@@ -159,6 +249,8 @@ HTML_TEMPLATE = """
             processBtn.disabled = selectedFiles.length === 0;
         }
 
+        let descriptionCount = 0;
+
         async function processImages() {
             if (selectedFiles.length === 0) return;
 
@@ -170,18 +262,19 @@ HTML_TEMPLATE = """
             document.getElementById('loading').style.display = 'block';
             processBtn.disabled = true;
             document.getElementById('results').innerHTML = '';
+            descriptionCount = 0;
 
             try {
                 const response = await fetch('/summarize', {
                     method: 'POST',
+                    headers: { 'Accept': 'text/event-stream' },
                     body: formData
                 });
 
-                const result = await response.json();
-
                 if (response.ok) {
-                    displayResults(result);
+                    await readEvents(response, handleEvent);
                 } else {
+                    const result = await response.json();
                     displayError(result.error || 'An error occurred');
                 }
             } catch (error) {
@@ -192,41 +285,63 @@ HTML_TEMPLATE = """
             }
         }
 
-        function displayResults(result) {
-            let html = '<h2>Results</h2>';
-            
-            if (result.error_message) {
-                html += `<div class="error">Error: ${result.error_message}</div>`;
-                document.getElementById('results').innerHTML = html;
-                return;
+        // Read a text/event-stream body, calling onEvent for each data message
+        async function readEvents(response, onEvent) {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                let boundary;
+                while ((boundary = buffer.indexOf('\\n\\n')) !== -1) {
+                    const message = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    if (message.startsWith('data: ')) {
+                        onEvent(JSON.parse(message.slice(6)));
+                    }
+                }
             }
+        }
 
-            html += `<div class="success">Successfully processed ${result.successful_descriptions}/${result.total_images} images</div>`;
+        function handleEvent(event) {
+            const results = document.getElementById('results');
 
-            if (result.failed_images && result.failed_images.length > 0) {
-                html += `<div class="error">Failed to process: ${result.failed_images.join(', ')}</div>`;
-            }
+            if (event.type === 'error') {
+                displayError(event.error);
+            } else if (event.type === 'description') {
+                // Failed images are listed together with the summary
+                if (!event.success) return;
 
-            if (result.descriptions && result.descriptions.length > 0) {
-                html += '<h3>Individual Descriptions</h3>';
-                result.descriptions.forEach((desc, index) => {
-                    html += `
-                        <div class="description">
-                            <strong>${index + 1}. ${desc.image_path.split('/').pop()}</strong><br>
-                            ${desc.description}
-                        </div>
-                    `;
-                });
-            }
+                if (descriptionCount === 0) {
+                    results.innerHTML = '<h2>Results</h2><h3>Individual Descriptions</h3>';
+                }
+                descriptionCount += 1;
+                results.insertAdjacentHTML('beforeend', `
+                    <div class="description">
+                        <strong>${descriptionCount}. ${event.filename}</strong><br>
+                        ${event.description}
+                    </div>
+                `);
+            } else if (event.type === 'summary') {
+                let html = descriptionCount === 0 ? '<h2>Results</h2>' : '';
+
+                html += `<div class="success">Successfully processed ${event.successful_descriptions}/${event.total_images} images</div>`;
+
+                if (event.failed_images.length > 0) {
+                    html += `<div class="error">Failed to process: ${event.failed_images.join(', ')}</div>`;
+                }
 
-            if (result.summary) {
                 html += `
                     <h3>Final Summary</h3>
-                    <div class="summary">${result.summary}</div>
+                    <div class="summary">${event.summary}</div>
                 `;
-            }
 
-            document.getElementById('results').innerHTML = html;
+                results.insertAdjacentHTML('beforeend', html);
+            }
         }
 
         function displayError(message) {
@@ -237,85 +352,149 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# The page has no server-side variables, so encode and compress it once
+_HTML_BYTES = HTML_TEMPLATE.encode('utf-8')
+_HTML_GZ = gzip.compress(_HTML_BYTES, 9)
+
 
 class ImageSummarizerAPI:
-    """Flask API for Image Summarizer."""
+    """Quart API for Image Summarizer."""
     
     def __init__(self, config_path: str = 'config/config.yaml'):
-        if not FLASK_AVAILABLE:
-            raise ImportError("Flask is required for the web API. Install with: pip install flask flask-cors")
+        if not QUART_AVAILABLE:
+            raise ImportError("Quart is required for the web API. Install with: pip install quart quart-cors")
         
-        self.app = Flask(__name__)
-        CORS(self.app)
+        # Deferred so that --help and module import stay fast
+        from quart_cors import cors
+        from src.workflow import ImageSummarizer
+        from src.config import load_config
+        
+        self.app = cors(Quart(__name__))
+        # Oversized bodies are rejected with 413 before the form is parsed
+        self.app.config['MAX_CONTENT_LENGTH'] = MAX_IMAGE_BYTES * MAX_IMAGES_PER_REQUEST
         
         # Load configuration
         self.config = load_config(config_path)
+        # Batch API jobs can take up to 24 hours, far longer than a request can wait
+        provider_config = self.config.providers.get(self.config.default_provider)
+        if provider_config is not None and provider_config.provider_settings.get('use_batch_api', False):
+            raise ValueError("use_batch_api is for the command line only; disable it to run the web API")
         self.summarizer = ImageSummarizer(self.config)
+        self.summarizer.enable_batching(
+            max_wait_ms=self.config.workflow.get('batch_wait_ms', 50)
+        )
+        
+        # Configuration is fixed for the process lifetime, so encode these once
+        self._info_json = _dump_json(self.summarizer.get_info())
+        self._health_json = _dump_json({'status': 'healthy', 'provider': self.config.default_provider})
         
         # Create upload directory
         self.upload_dir = Path('uploads')
         self.upload_dir.mkdir(exist_ok=True)
         
+        # Fixed pool of job directories, recycled after each request
+        self._slot_paths = [self.upload_dir / f'slot_{i}' for i in range(UPLOAD_SLOTS)]
+        for slot in self._slot_paths:
+            _reset_slot(slot)
+        self._job_slots = None
+        self._stream_tasks = set()
+        
         # Setup routes
         self._setup_routes()
     
     def _setup_routes(self):
-        """Setup Flask routes."""
+        """Setup Quart routes."""
         
         @self.app.route('/')
-        def index():
-            return render_template_string(HTML_TEMPLATE)
+        async def index():
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                response = Response(_HTML_GZ, mimetype='text/html')
+                response.headers['Content-Encoding'] = 'gzip'
+            else:
+                response = Response(_HTML_BYTES, mimetype='text/html')
+            response.headers['Vary'] = 'Accept-Encoding'
+            return response
         
         @self.app.route('/config')
-        def get_config():
-            info = self.summarizer.get_info()
-            return jsonify(info)
+        async def get_config():
+            return Response(self._info_json, mimetype='application/json')
         
         @self.app.route('/health')
-        def health():
-            return jsonify({'status': 'healthy', 'provider': self.config.default_provider})
+        async def health():
+            return Response(self._health_json, mimetype='application/json')
         
         @self.app.route('/summarize', methods=['POST'])
-        def summarize():
+        async def summarize():
             try:
                 # Get uploaded files
-                if 'images' not in request.files:
+                uploaded = await request.files
+                if 'images' not in uploaded:
                     return jsonify({'error': 'No images uploaded'}), 400
                 
-                files = request.files.getlist('images')
-                if not files:
-                    return jsonify({'error': 'No images provided'}), 400
-                
-                # Save uploaded files
-                image_paths = []
-                job_id = str(uuid.uuid4())
-                job_dir = self.upload_dir / job_id
-                job_dir.mkdir(exist_ok=True)
+                files = [file for file in uploaded.getlist('images') if file.filename]
+                if len(files) > MAX_IMAGES_PER_REQUEST:
+                    return jsonify({'error': f'Too many images (at most {MAX_IMAGES_PER_REQUEST} per request)'}), 400
                 
+                # Reject anything that is not an image before touching disk
+                uploads = []
+                rejected = []
                 for file in files:
-                    if file.filename:
-                        filename = secure_filename(file.filename)
-                        file_path = job_dir / filename
-                        file.save(str(file_path))
-                        image_paths.append(str(file_path))
+                    if _is_image(file):
+                        uploads.append(file)
+                    else:
+                        rejected.append(file.filename)
+                if not uploads:
+                    return jsonify({'error': 'No images provided', 'failed_images': rejected}), 400
                 
-                # Process images
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
+                for file in uploads:
+                    if _upload_size(file) > MAX_IMAGE_BYTES:
+                        return jsonify({'error': f'Image too large: {file.filename}'}), 413
+                
+                # Save uploaded files
+                job_id = str(uuid.uuid4())
+                job_dir = await self._acquire_slot()
+                stream = 'text/event-stream' in request.headers.get('Accept', '')
                 try:
-                    result = loop.run_until_complete(self.summarizer.process_images(image_paths))
+                    job_dir_str = str(job_dir)
+                    
+                    # Write all files concurrently off the event loop. The index
+                    # prefix keeps names unique once sanitized ("a b.jpg" and
+                    # "a_b.jpg" would otherwise collide)
+                    image_paths = [
+                        job_dir_str + os.sep + f"{i}_{fast_secure_filename(file.filename)}"
+                        for i, file in enumerate(uploads)
+                    ]
+                    filenames = {path: file.filename for path, file in zip(image_paths, uploads)}
+                    await asyncio.gather(*(
+                        asyncio.to_thread(_save_upload, file, file_path)
+                        for file, file_path in zip(uploads, image_paths)
+                    ))
+                    
+                    if stream:
+                        # The background task now owns the slot
+                        events = self._start_stream(image_paths, filenames, rejected, job_id, job_dir)
+                        job_dir = None
+                        response = Response(_relay_events(events), mimetype='text/event-stream')
+                        response.headers['Cache-Control'] = 'no-cache'
+                        return response
+                    
+                    # Process images
+                    result = await self.summarizer.process_images(image_paths)
                 finally:
-                    loop.close()
+                    if job_dir is not None:
+                        await self._release_slot(job_dir)
                 
                 # Convert result to JSON-serializable format
                 response = {
                     'summary': result.summary,
-                    'total_images': result.total_images,
+                    'total_images': result.total_images + len(rejected),
                     'successful_descriptions': result.successful_descriptions,
-                    'failed_images': result.failed_images,
+                    # Report the uploaded names, not the stored slot paths
+                    'failed_images': [filenames.get(path, path) for path in result.failed_images] + rejected,
                     'descriptions': [
                         {
                             'image_path': desc.image_path,
+                            'filename': filenames.get(desc.image_path),
                             'description': desc.description,
                             'success': desc.success,
                             'error_message': desc.error_message
@@ -327,13 +506,90 @@ class ImageSummarizerAPI:
                     'job_id': job_id
                 }
                 
-                return jsonify(response)
+                return Response(_dump_json(response), mimetype='application/json')
                 
+            except RequestEntityTooLarge:
+                return jsonify({'error': 'Upload too large'}), 413
             except Exception as e:
                 return jsonify({'error': f'Server error: {str(e)}'}), 500
     
+    def _start_stream(self, image_paths, filenames, rejected, job_id, job_dir) -> asyncio.Queue:
+        """Describe images in a background task, publishing events to a queue.
+        
+        The task runs to completion even if the client disconnects, so the
+        upload slot is always released and finished descriptions still land
+        in the cache.
+        """
+        events = asyncio.Queue()
+        
+        async def produce():
+            try:
+                for filename in rejected:
+                    await events.put({
+                        'type': 'description',
+                        'image_path': None,
+                        'filename': filename,
+                        'description': '',
+                        'success': False,
+                        'error_message': f'Not an image: {filename}'
+                    })
+                
+                descriptions = []
+                async for desc in self.summarizer.iter_descriptions(image_paths):
+                    descriptions.append(desc)
+                    await events.put({
+                        'type': 'description',
+                        'image_path': desc.image_path,
+                        'filename': filenames.get(desc.image_path),
+                        'description': desc.description,
+                        'success': desc.success,
+                        'error_message': desc.error_message
+                    })
+                
+                successful = [desc for desc in descriptions if desc.success]
+                if successful:
+                    summary = await self.summarizer.summarize_descriptions(successful)
+                else:
+                    summary = "No images could be processed successfully."
+                
+                await events.put({
+                    'type': 'summary',
+                    'summary': summary,
+                    'total_images': len(image_paths) + len(rejected),
+                    'successful_descriptions': len(successful),
+                    'failed_images': [filenames.get(desc.image_path, desc.image_path) for desc in descriptions if not desc.success] + rejected,
+                    'job_id': job_id
+                })
+            except Exception as e:
+                await events.put({'type': 'error', 'error': f'Server error: {str(e)}'})
+            finally:
+                await self._release_slot(job_dir)
+                await events.put(None)
+        
+        task = asyncio.ensure_future(produce())
+        self._stream_tasks.add(task)
+        task.add_done_callback(self._stream_tasks.discard)
+        return events
+    
+    async def _acquire_slot(self) -> Path:
+        """Wait for a free upload directory."""
+        if self._job_slots is None:
+            # Created lazily so the queue belongs to the serving event loop
+            self._job_slots = asyncio.Queue()
+            for slot in self._slot_paths:
+                self._job_slots.put_nowait(slot)
+        return await self._job_slots.get()
+    
+    async def _release_slot(self, slot: Path):
+        """Clear an upload directory and return it to the pool."""
+        from src.image_encoding import forget_directory
+        # Its paths are reused by the next job, so drop their cached encodings
+        forget_directory(slot)
+        await asyncio.to_thread(_reset_slot, slot)
+        self._job_slots.put_nowait(slot)
+    
     def run(self, host='0.0.0.0', port=5000, debug=False):
-        """Run the Flask application."""
+        """Run the Quart application."""
         print(f"Starting Image Summarizer API")
         print(f"Provider: {self.config.default_provider}")
         print(f"Server: http://{host}:{port}")
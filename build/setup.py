@@ -2,7 +2,7 @@
 Setup script for the Image Summarizer package.
 """
 
-from setuptools import setup, find_packages
+from setuptools import setup
 from pathlib import Path
 
 # Read README
@@ -20,12 +20,12 @@ extras_require = {
     'bedrock': ['boto3>=1.26.0'],
     'azure': ['openai>=1.0.0'],
     'openai': ['openai>=1.0.0'],
-    'web': ['flask>=2.0.0', 'flask-cors>=4.0.0'],
+    'web': ['quart>=0.19.0', 'quart-cors>=0.7.0'],
     'all': [
         'boto3>=1.26.0',
         'openai>=1.0.0', 
-        'flask>=2.0.0',
-        'flask-cors>=4.0.0'
+        'quart>=0.19.0',
+        'quart-cors>=0.7.0'
     ]
 }
 
@@ -36,9 +36,9 @@ setup(
     long_description=long_description,
     long_description_content_type='text/markdown',
     author='Image Summarizer Team',
-    python_requires='>=3.8',
-    packages=find_packages(where='..'),
-    package_dir={'': '..'},
+    python_requires='>=3.9',
+    packages=['src'],
+    package_dir={'src': '../src'},
     install_requires=requirements,
     extras_require=extras_require,
     entry_points={
@@ -54,7 +54,6 @@ setup(
         'Topic :: Multimedia :: Graphics',
         'License :: OSI Approved :: MIT License',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.8',
         'Programming Language :: Python :: 3.9',
         'Programming Language :: Python :: 3.10',
         'Programming Language :: Python :: 3.11',
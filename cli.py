@@ -13,14 +13,25 @@ Usage:
 import asyncio
 import argparse
 import json
+import os
 import sys
 from pathlib import Path
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
-from src.workflow import ImageSummarizer
-from src.config import load_config
+
+def _dump_json(data) -> str:
+    """Serialize data to indented JSON, using orjson when installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(data, indent=2)
 
 
 async def main():
@@ -61,6 +72,11 @@ async def main():
     
     args = parser.parse_args()
     
+    # Deferred until after argument parsing so --help stays fast
+    from dataclasses import replace
+    from src.workflow import ImageSummarizer
+    from src.config import load_config
+    
     try:
         # Load configuration
         print(f"Loading configuration from: {args.config}")
@@ -68,7 +84,7 @@ async def main():
         
         # Override provider if specified
         if args.provider:
-            config.default_provider = args.provider
+            config = replace(config, default_provider=args.provider)
         
         # Initialize workflow
         summarizer = ImageSummarizer(config)
@@ -102,9 +118,12 @@ async def main():
                 'metadata': result.metadata
             }
             
-            print(json.dumps(output, indent=2))
+            json_text = _dump_json(output)
+            print(json_text)
             
         else:  # text format
+            names = [os.path.basename(desc.image_path) for desc in result.descriptions]
+            
             print("=" * 60)
             print("IMAGE SUMMARIZATION RESULTS")
             print("=" * 60)
@@ -118,13 +137,13 @@ async def main():
             if result.failed_images:
                 print(f"\nFailed images ({len(result.failed_images)}):")
                 for img in result.failed_images:
-                    print(f"  - {Path(img).name}")
+                    print(f"  - {os.path.basename(img)}")
             
             if result.descriptions:
                 print(f"\nIndividual Descriptions:")
                 print("-" * 40)
-                for i, desc in enumerate(result.descriptions, 1):
-                    print(f"\n{i}. {Path(desc.image_path).name}:")
+                for i, (name, desc) in enumerate(zip(names, result.descriptions), 1):
+                    print(f"\n{i}. {name}:")
                     print(f"   {desc.description}")
             
             print(f"\nFINAL SUMMARY:")
@@ -137,23 +156,26 @@ async def main():
             
             if args.format == 'json':
                 with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(output, f, indent=2)
+                    f.write(json_text)
             else:
+                parts = [
+                    "IMAGE SUMMARIZATION RESULTS\n",
+                    "=" * 60 + "\n\n",
+                    f"Successfully processed: {result.successful_descriptions}/{result.total_images} images\n\n"
+                ]
+                
+                if result.descriptions:
+                    parts.append("Individual Descriptions:\n")
+                    parts.append("-" * 40 + "\n")
+                    for i, (name, desc) in enumerate(zip(names, result.descriptions), 1):
+                        parts.append(f"\n{i}. {name}:\n{desc.description}\n")
+                
+                parts.append("\nFINAL SUMMARY:\n")
+                parts.append("-" * 30 + "\n")
+                parts.append(f"{result.summary}\n")
+                
                 with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write("IMAGE SUMMARIZATION RESULTS\n")
-                    f.write("=" * 60 + "\n\n")
-                    f.write(f"Successfully processed: {result.successful_descriptions}/{result.total_images} images\n\n")
-                    
-                    if result.descriptions:
-                        f.write("Individual Descriptions:\n")
-                        f.write("-" * 40 + "\n")
-                        for i, desc in enumerate(result.descriptions, 1):
-                            f.write(f"\n{i}. {Path(desc.image_path).name}:\n")
-                            f.write(f"{desc.description}\n")
-                    
-                    f.write(f"\nFINAL SUMMARY:\n")
-                    f.write("-" * 30 + "\n")
-                    f.write(f"{result.summary}\n")
+                    f.write(''.join(parts))
             
             print(f"\nResults saved to: {output_path}")
         
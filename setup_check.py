@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Image Summarizer - Setup Check
+
+Usage:
+    python setup_check.py
+"""
+
+import importlib.util
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Importable module name -> what it is used for
+DEPENDENCIES = {
+    'yaml': 'Configuration loading (required)',
+    'PIL': 'Image loading for local models',
+    'boto3': 'Amazon Bedrock provider',
+    'openai': 'Azure OpenAI and OpenAI providers',
+    'torch': 'LLaVA and Falcon local models',
+    'transformers': 'LLaVA and Falcon local models',
+    'quart': 'Web interface',
+    'quart_cors': 'Web interface',
+    'orjson': 'Faster JSON output (optional)',
+    'pytest': 'Running tests',
+}
+
+
+def _is_installed(package: str) -> bool:
+    """Check whether a module can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(package) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def check_dependencies() -> dict:
+    """Report which dependencies are installed."""
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = dict(zip(DEPENDENCIES, executor.map(_is_installed, DEPENDENCIES)))
+
+    print("Checking dependencies...")
+    for package, purpose in DEPENDENCIES.items():
+        mark = '[OK]' if results[package] else '[--]'
+        print(f"  {mark} {package:<14} {purpose}")
+
+    return results
+
+
+def main():
+    """Main function for the setup check."""
+    results = check_dependencies()
+
+    if not results['yaml']:
+        print("\nPyYAML is required. Install with: pip install pyyaml")
+        return 1
+
+    print("\nCore dependencies are installed.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,18 +2,74 @@
 Azure OpenAI integration for image description and text summarization.
 """
 
-import base64
+import asyncio
+import hashlib
+import json
+import os
+import weakref
 from typing import List
-from pathlib import Path
 
 try:
-    from openai import AzureOpenAI
+    from openai import AsyncAzureOpenAI
     AZURE_OPENAI_AVAILABLE = True
 except ImportError:
     AZURE_OPENAI_AVAILABLE = False
 
-from .interfaces import ImageDescriber, TextSummarizer, ImageDescription
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+from .interfaces import ImageDescriber, TextSummarizer, ImageDescription, SUMMARY_ERROR_PREFIX
 from .config import ModelConfig
+from .image_encoding import EncodeCache, encode_image_cached, media_type
+
+
+# First API version with the Batch API
+_BATCH_API_VERSION = '2024-10-21'
+
+# httpx connection pools belong to the event loop that opened them, and the
+# providers outlive a single loop, so clients are kept per running loop
+_http_clients = weakref.WeakKeyDictionary()
+
+
+def _shared_http_client():
+    """HTTP client shared by all Azure clients on the running loop so connections are reused."""
+    if not HTTPX_AVAILABLE:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None:
+        client = _http_clients[loop] = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+    return client
+
+
+def _loop_client(clients: weakref.WeakKeyDictionary, provider_settings: dict):
+    """Azure OpenAI client for the running loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    client = clients.get(loop)
+    if client is None:
+        api_version = provider_settings.get('api_version', '2024-02-15-preview')
+        if provider_settings.get('use_batch_api', False):
+            api_version = provider_settings.get('batch_api_version', _BATCH_API_VERSION)
+        client = clients[loop] = AsyncAzureOpenAI(
+            api_key=provider_settings.get('api_key'),
+            api_version=api_version,
+            azure_endpoint=provider_settings.get('endpoint'),
+            http_client=_shared_http_client()
+        )
+    return client
+
+
+def _request_options(config: ModelConfig, provider_settings: dict) -> dict:
+    """Extra request options, routing calls with the same system prompt to one prompt cache."""
+    if not provider_settings.get('prompt_caching', False):
+        return {}
+    prompt_key = hashlib.sha256(config.system_prompt.encode('utf-8')).hexdigest()[:32]
+    return {'extra_body': {'prompt_cache_key': prompt_key}}
 
 
 class AzureOpenAIImageDescriber(ImageDescriber):
@@ -26,22 +82,52 @@ class AzureOpenAIImageDescriber(ImageDescriber):
         self.config = config
         self.provider_settings = provider_settings
         
-        # Initialize Azure OpenAI client
-        self.client = AzureOpenAI(
-            api_key=provider_settings.get('api_key'),
-            api_version=provider_settings.get('api_version', '2024-02-15-preview'),
-            azure_endpoint=provider_settings.get('endpoint')
-        )
+        # Azure OpenAI clients, one per event loop (see _loop_client)
+        self._clients = weakref.WeakKeyDictionary()
+        self._request_options = _request_options(config, provider_settings)
+        # A Batch API job per workflow batch would queue many day-long jobs
+        self.single_batch = provider_settings.get('use_batch_api', False)
+        
+        # Recently encoded images, reused by retries and fallback requests
+        self._encode_cache = EncodeCache(provider_settings.get('max_encode_cache_mb', 64) * 1024 * 1024)
+    
+    @property
+    def client(self):
+        return _loop_client(self._clients, self.provider_settings)
+    
+    def _image_url(self, image_path: str) -> str:
+        """Build the base64 data URL sent for an image."""
+        prefix = f"data:{media_type(image_path)};base64,".encode('ascii')
+        return encode_image_cached(self._encode_cache, image_path, prefix=prefix)
     
-    def _encode_image(self, image_path: str) -> str:
-        """Encode image to base64."""
-        with open(image_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+    def _describe_messages(self, image_url: str) -> List[dict]:
+        """Chat messages asking for a description of one image."""
+        return [
+            {
+                "role": "system",
+                "content": self.config.system_prompt
+            },
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "Please describe this image in detail."
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": image_url
+                        }
+                    }
+                ]
+            }
+        ]
     
     async def describe_image(self, image_path: str) -> ImageDescription:
         """Describe a single image using Azure OpenAI."""
         try:
-            if not Path(image_path).exists():
+            if not os.path.isfile(image_path):
                 return ImageDescription(
                     image_path=image_path,
                     description="",
@@ -49,58 +135,29 @@ class AzureOpenAIImageDescriber(ImageDescriber):
                     error_message=f"Image file not found: {image_path}"
                 )
             
-            # Encode image
-            image_base64 = self._encode_image(image_path)
-            image_ext = Path(image_path).suffix.lower()
-            
-            # Determine media type
-            media_type_map = {
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg', 
-                '.png': 'image/png',
-                '.gif': 'image/gif',
-                '.webp': 'image/webp'
-            }
-            media_type = media_type_map.get(image_ext, 'image/jpeg')
+            # Encode image off the event loop
+            image_url = await asyncio.to_thread(self._image_url, image_path)
             
             # Make request to Azure OpenAI
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.config.model_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": self.config.system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "Please describe this image in detail."
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:{media_type};base64,{image_base64}"
-                                }
-                            }
-                        ]
-                    }
-                ],
+                messages=self._describe_messages(image_url),
                 max_tokens=self.config.max_tokens,
-                temperature=self.config.temperature
+                temperature=self.config.temperature,
+                **self._request_options
             )
             
             description = response.choices[0].message.content
             
+            metadata = {'model': self.config.model_name}
+            if response.usage is not None and self.provider_settings.get('track_usage', False):
+                metadata['usage'] = response.usage.model_dump(exclude_none=True)
+            
             return ImageDescription(
                 image_path=image_path,
                 description=description,
                 success=True,
-                metadata={
-                    'model': self.config.model_name,
-                    'usage': response.usage.dict() if response.usage else None
-                }
+                metadata=metadata
             )
             
         except Exception as e:
@@ -112,11 +169,198 @@ class AzureOpenAIImageDescriber(ImageDescriber):
             )
     
     async def describe_images_batch(self, image_paths: List[str]) -> List[ImageDescription]:
-        """Describe multiple images."""
+        """Describe multiple images concurrently, bounded by max_concurrency.
+        
+        When ``use_batch_api`` is set, the whole batch is submitted as an
+        offline Batch API job. When ``row_marshal_batch`` is above 1, images
+        are grouped into multi-image requests of that size instead of one
+        request each.
+        """
+        if self.provider_settings.get('use_batch_api', False):
+            return await self.describe_images_offline(image_paths)
+        
+        rows_per_call = self.provider_settings.get('row_marshal_batch', 1)
+        if rows_per_call > 1 and len(image_paths) > 1:
+            return await self.describe_images_marshaled(image_paths, rows_per_call)
+        
+        semaphore = asyncio.Semaphore(self.provider_settings.get('max_concurrency', 20))
+        
+        async def describe(image_path: str) -> ImageDescription:
+            async with semaphore:
+                return await self.describe_image(image_path)
+        
+        return list(await asyncio.gather(*(describe(path) for path in image_paths)))
+    
+    async def describe_images_offline(self, image_paths: List[str]) -> List[ImageDescription]:
+        """Describe images through the Batch API, waiting for the job to finish.
+        
+        Batch jobs are billed at a discount and do not count against the
+        per-minute rate limit, but may take up to 24 hours, so this is for
+        the command line only. The deployment must be a batch deployment.
+        """
+        results = {}
+        found = [idx for idx, image_path in enumerate(image_paths) if os.path.isfile(image_path)]
+        for idx, image_path in enumerate(image_paths):
+            if idx not in found:
+                results[idx] = ImageDescription(
+                    image_path=image_path,
+                    description="",
+                    success=False,
+                    error_message=f"Image file not found: {image_path}"
+                )
+        
+        image_urls = await asyncio.gather(*(asyncio.to_thread(self._image_url, image_paths[idx]) for idx in found))
+        lines = []
+        for idx, image_url in zip(found, image_urls):
+            lines.append(json.dumps({
+                "custom_id": str(idx),
+                "method": "POST",
+                "url": "/chat/completions",
+                "body": {
+                    "model": self.config.model_name,
+                    "messages": self._describe_messages(image_url),
+                    "max_tokens": self.config.max_tokens,
+                    "temperature": self.config.temperature
+                }
+            }))
+        
+        error_message = None
+        if lines:
+            try:
+                batch_file = await self.client.files.create(
+                    file=('images.jsonl', '\n'.join(lines).encode('utf-8')),
+                    purpose='batch'
+                )
+                batch = await self.client.batches.create(
+                    input_file_id=batch_file.id,
+                    endpoint='/chat/completions',
+                    completion_window='24h'
+                )
+                
+                # Poll with exponential backoff until the job settles
+                delay = 5
+                while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 300)
+                    batch = await self.client.batches.retrieve(batch.id)
+                
+                # Successful requests land in the output file, failed ones in the error file
+                for file_id in (batch.output_file_id, batch.error_file_id):
+                    if not file_id:
+                        continue
+                    output = await self.client.files.content(file_id)
+                    for line in output.text.splitlines():
+                        if not line:
+                            continue
+                        record = json.loads(line)
+                        idx = int(record['custom_id'])
+                        response = record.get('response') or {}
+                        body = response.get('body') or {}
+                        if response.get('status_code') == 200:
+                            results[idx] = ImageDescription(
+                                image_path=image_paths[idx],
+                                description=body['choices'][0]['message']['content'],
+                                success=True,
+                                metadata={
+                                    'model': self.config.model_name,
+                                    'usage': body.get('usage'),
+                                    'batch_id': batch.id
+                                }
+                            )
+                        else:
+                            error = record.get('error') or body.get('error') or {}
+                            results[idx] = ImageDescription(
+                                image_path=image_paths[idx],
+                                description="",
+                                success=False,
+                                error_message=f"Error describing image: {error.get('message', error)}"
+                            )
+                error_message = f"Batch job {batch.id} {batch.status}"
+            except Exception as e:
+                error_message = f"Error describing image: {str(e)}"
+        
+        return [
+            results.get(idx) or ImageDescription(
+                image_path=image_path,
+                description="",
+                success=False,
+                error_message=error_message
+            )
+            for idx, image_path in enumerate(image_paths)
+        ]
+    
+    async def describe_images_marshaled(self, image_paths: List[str], rows_per_call: int = 4) -> List[ImageDescription]:
+        """Describe images several per request, fewer calls against the rate limit."""
+        semaphore = asyncio.Semaphore(self.provider_settings.get('max_concurrency', 20))
+        groups = [image_paths[i:i + rows_per_call] for i in range(0, len(image_paths), rows_per_call)]
+        
+        async def describe(group: List[str]) -> List[ImageDescription]:
+            async with semaphore:
+                return await self._describe_group(group)
+        
+        results = await asyncio.gather(*(describe(group) for group in groups))
+        return [description for group in results for description in group]
+    
+    async def _describe_group(self, image_paths: List[str]) -> List[ImageDescription]:
+        """Describe a group of images in one request, parsing one JSON entry per image.
+        
+        Images the model leaves out of its answer, or a whole group whose
+        request fails, fall back to one request per image.
+        """
+        try:
+            content = [
+                {
+                    "type": "text",
+                    "text": (
+                        f"Please describe each of these {len(image_paths)} images in detail. "
+                        'Respond with JSON of the form {"descriptions": [{"idx": <image number>, "text": <description>}]}.'
+                    )
+                }
+            ]
+            image_urls = await asyncio.gather(*(asyncio.to_thread(self._image_url, path) for path in image_paths))
+            for idx, image_url in enumerate(image_urls, 1):
+                content.append({"type": "text", "text": f"Image {idx}:"})
+                content.append({"type": "image_url", "image_url": {"url": image_url}})
+            
+            response = await self.client.chat.completions.create(
+                model=self.config.model_name,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": self.config.system_prompt
+                    },
+                    {
+                        "role": "user",
+                        "content": content
+                    }
+                ],
+                max_tokens=self.config.max_tokens * len(image_paths),
+                temperature=self.config.temperature,
+                response_format={"type": "json_object"},
+                **self._request_options
+            )
+            
+            parsed = json.loads(response.choices[0].message.content)
+            texts = {int(item['idx']): item['text'] for item in parsed.get('descriptions', [])}
+        except Exception:
+            texts = {}
+        
+        # Retry the images left out concurrently, one request each
+        missing = [idx for idx in range(1, len(image_paths) + 1) if not texts.get(idx)]
+        retried = await asyncio.gather(*(self.describe_image(image_paths[idx - 1]) for idx in missing))
+        retried = dict(zip(missing, retried))
+        
         results = []
-        for image_path in image_paths:
-            result = await self.describe_image(image_path)
-            results.append(result)
+        for idx, image_path in enumerate(image_paths, 1):
+            if idx in retried:
+                results.append(retried[idx])
+            else:
+                results.append(ImageDescription(
+                    image_path=image_path,
+                    description=texts[idx],
+                    success=True,
+                    metadata={'model': self.config.model_name, 'marshaled': True}
+                ))
         return results
 
 
@@ -130,12 +374,13 @@ class AzureOpenAITextSummarizer(TextSummarizer):
         self.config = config
         self.provider_settings = provider_settings
         
-        # Initialize Azure OpenAI client
-        self.client = AzureOpenAI(
-            api_key=provider_settings.get('api_key'),
-            api_version=provider_settings.get('api_version', '2024-02-15-preview'),
-            azure_endpoint=provider_settings.get('endpoint')
-        )
+        # Azure OpenAI clients, one per event loop (see _loop_client)
+        self._clients = weakref.WeakKeyDictionary()
+        self._request_options = _request_options(config, provider_settings)
+    
+    @property
+    def client(self):
+        return _loop_client(self._clients, self.provider_settings)
     
     async def summarize(self, descriptions: List[str]) -> str:
         """Create a summary from descriptions using Azure OpenAI."""
@@ -147,7 +392,7 @@ class AzureOpenAITextSummarizer(TextSummarizer):
             ])
             
             # Make request to Azure OpenAI
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.config.model_name,
                 messages=[
                     {
@@ -160,10 +405,11 @@ class AzureOpenAITextSummarizer(TextSummarizer):
                     }
                 ],
                 max_tokens=self.config.max_tokens,
-                temperature=self.config.temperature
+                temperature=self.config.temperature,
+                **self._request_options
             )
             
             return response.choices[0].message.content
             
         except Exception as e:
-            return f"Error creating summary: {str(e)}"
\ No newline at end of file
+            return f"{SUMMARY_ERROR_PREFIX}: {str(e)}"
\ No newline at end of file
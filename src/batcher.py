@@ -0,0 +1,92 @@
+"""
+Micro-batching of image description requests across concurrent callers.
+"""
+
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, List, Optional
+
+from .interfaces import ImageDescription
+
+
+class ImageBatcher:
+    """Coalesce images submitted by concurrent callers into shared batches.
+
+    Images are queued until either ``max_items`` are waiting or ``max_wait_ms``
+    has passed since the first one arrived, then dispatched together through a
+    single ``processor`` call (typically ``ImageDescriber.describe_images_batch``).
+    """
+
+    def __init__(
+        self,
+        processor: Callable[[List[str]], Awaitable[List[ImageDescription]]],
+        max_items: int = 16,
+        max_wait_ms: float = 50,
+        max_concurrent: Optional[int] = None
+    ):
+        if max_items <= 0:
+            raise ValueError("max_items must be positive")
+
+        self.processor = processor
+        self.max_items = max_items
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrent = max_concurrent
+
+        self._pending = deque()
+        self._timer = None
+        self._semaphore = None
+        self._tasks = set()
+
+    async def add(self, image_path: str) -> ImageDescription:
+        """Queue an image and wait for its description."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((image_path, future))
+
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Dispatch everything currently queued as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._pending:
+            return
+
+        batch = list(self._pending)
+        self._pending.clear()
+
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        """Describe one batch and resolve the waiting callers."""
+        if self._semaphore is None and self.max_concurrent:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        paths = [path for path, _ in batch]
+        error = None
+        try:
+            if self._semaphore is not None:
+                async with self._semaphore:
+                    results = await self.processor(paths)
+            else:
+                results = await self.processor(paths)
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            error = e
+        finally:
+            # Short results, errors and cancellation must not leave a caller waiting
+            for path, future in batch:
+                if not future.done():
+                    future.set_exception(error or RuntimeError(f"No description returned for {path}"))
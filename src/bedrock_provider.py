@@ -3,19 +3,65 @@ Amazon Bedrock integration for image description and text summarization.
 """
 
 import json
-import base64
+import asyncio
+import functools
+import os
 from typing import List
-from pathlib import Path
 
 try:
     import boto3
+    from botocore.config import Config as BotoConfig
     from botocore.exceptions import ClientError
     BEDROCK_AVAILABLE = True
 except ImportError:
     BEDROCK_AVAILABLE = False
 
-from .interfaces import ImageDescriber, TextSummarizer, ImageDescription
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from .interfaces import ImageDescriber, TextSummarizer, ImageDescription, SUMMARY_ERROR_PREFIX
 from .config import ModelConfig
+from .image_encoding import EncodeCache, encode_image_cached, media_type
+
+
+@functools.lru_cache(maxsize=None)
+def _get_client(region_name: str, aws_access_key_id: str, aws_secret_access_key: str):
+    """Bedrock runtime client shared by all instances with the same credentials.
+
+    boto3 clients are thread-safe, so one pooled client serves every
+    concurrent request instead of each instance opening its own connections.
+    """
+    return boto3.client(
+        'bedrock-runtime',
+        region_name=region_name,
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key,
+        config=BotoConfig(max_pool_connections=50, tcp_keepalive=True)
+    )
+
+
+def _system_prompt(system_prompt: str, prompt_caching: bool):
+    """System prompt for a Claude request, marked cacheable when enabled.
+
+    The system prompt is the only part of each request that is identical
+    across calls, so it is the prefix Bedrock can reuse between requests.
+    """
+    if not prompt_caching:
+        return system_prompt
+    return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+
+
+def _invoke_model(client, model_id: str, request_body: dict) -> dict:
+    """Invoke a Bedrock model and return the parsed response body."""
+    if ORJSON_AVAILABLE:
+        response = client.invoke_model(modelId=model_id, body=orjson.dumps(request_body))
+        return orjson.loads(response['body'].read())
+    
+    response = client.invoke_model(modelId=model_id, body=json.dumps(request_body))
+    return json.load(response['body'])
 
 
 class BedrockImageDescriber(ImageDescriber):
@@ -29,22 +75,55 @@ class BedrockImageDescriber(ImageDescriber):
         self.provider_settings = provider_settings
         
         # Initialize Bedrock client
-        self.client = boto3.client(
-            'bedrock-runtime',
-            region_name=provider_settings.get('aws_region', 'us-east-1'),
-            aws_access_key_id=provider_settings.get('aws_access_key_id'),
-            aws_secret_access_key=provider_settings.get('aws_secret_access_key')
+        self.client = _get_client(
+            provider_settings.get('aws_region', 'us-east-1'),
+            provider_settings.get('aws_access_key_id'),
+            provider_settings.get('aws_secret_access_key')
+        )
+        self._system = _system_prompt(
+            config.system_prompt, provider_settings.get('prompt_caching', False)
         )
+        
+        # Recently encoded images, reused by retries
+        self._encode_cache = EncodeCache(provider_settings.get('max_encode_cache_mb', 64) * 1024 * 1024)
     
-    def _encode_image(self, image_path: str) -> str:
-        """Encode image to base64."""
-        with open(image_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+    def _invoke(self, image_path: str) -> dict:
+        """Encode an image and send it to Bedrock (runs in a worker thread)."""
+        image_base64 = encode_image_cached(self._encode_cache, image_path)
+        
+        # Prepare request for Claude
+        request_body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": self.config.max_tokens,
+            "temperature": self.config.temperature,
+            "system": self._system,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "image",
+                            "source": {
+                                "type": "base64",
+                                "media_type": media_type(image_path),
+                                "data": image_base64
+                            }
+                        },
+                        {
+                            "type": "text",
+                            "text": "Please describe this image in detail."
+                        }
+                    ]
+                }
+            ]
+        }
+        
+        return _invoke_model(self.client, self.config.model_name, request_body)
     
     async def describe_image(self, image_path: str) -> ImageDescription:
         """Describe a single image using Bedrock."""
         try:
-            if not Path(image_path).exists():
+            if not os.path.isfile(image_path):
                 return ImageDescription(
                     image_path=image_path,
                     description="",
@@ -52,44 +131,8 @@ class BedrockImageDescriber(ImageDescriber):
                     error_message=f"Image file not found: {image_path}"
                 )
             
-            # Encode image
-            image_base64 = self._encode_image(image_path)
-            
-            # Prepare request for Claude
-            request_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": self.config.max_tokens,
-                "temperature": self.config.temperature,
-                "system": self.config.system_prompt,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": image_base64
-                                }
-                            },
-                            {
-                                "type": "text",
-                                "text": "Please describe this image in detail."
-                            }
-                        ]
-                    }
-                ]
-            }
-            
-            # Make request to Bedrock
-            response = self.client.invoke_model(
-                modelId=self.config.model_name,
-                body=json.dumps(request_body)
-            )
-            
-            # Parse response
-            response_body = json.loads(response['body'].read())
+            # Encode and invoke in one worker thread; both block
+            response_body = await asyncio.to_thread(self._invoke, image_path)
             description = response_body['content'][0]['text']
             
             return ImageDescription(
@@ -115,12 +158,14 @@ class BedrockImageDescriber(ImageDescriber):
             )
     
     async def describe_images_batch(self, image_paths: List[str]) -> List[ImageDescription]:
-        """Describe multiple images."""
-        results = []
-        for image_path in image_paths:
-            result = await self.describe_image(image_path)
-            results.append(result)
-        return results
+        """Describe multiple images concurrently, bounded by max_concurrency."""
+        semaphore = asyncio.Semaphore(self.provider_settings.get('max_concurrency', 20))
+        
+        async def describe(image_path: str) -> ImageDescription:
+            async with semaphore:
+                return await self.describe_image(image_path)
+        
+        return list(await asyncio.gather(*(describe(path) for path in image_paths)))
 
 
 class BedrockTextSummarizer(TextSummarizer):
@@ -134,11 +179,13 @@ class BedrockTextSummarizer(TextSummarizer):
         self.provider_settings = provider_settings
         
         # Initialize Bedrock client
-        self.client = boto3.client(
-            'bedrock-runtime',
-            region_name=provider_settings.get('aws_region', 'us-east-1'),
-            aws_access_key_id=provider_settings.get('aws_access_key_id'),
-            aws_secret_access_key=provider_settings.get('aws_secret_access_key')
+        self.client = _get_client(
+            provider_settings.get('aws_region', 'us-east-1'),
+            provider_settings.get('aws_access_key_id'),
+            provider_settings.get('aws_secret_access_key')
+        )
+        self._system = _system_prompt(
+            config.system_prompt, provider_settings.get('prompt_caching', False)
         )
     
     async def summarize(self, descriptions: List[str]) -> str:
@@ -155,7 +202,7 @@ class BedrockTextSummarizer(TextSummarizer):
                 "anthropic_version": "bedrock-2023-05-31",
                 "max_tokens": self.config.max_tokens,
                 "temperature": self.config.temperature,
-                "system": self.config.system_prompt,
+                "system": self._system,
                 "messages": [
                     {
                         "role": "user",
@@ -164,17 +211,13 @@ class BedrockTextSummarizer(TextSummarizer):
                 ]
             }
             
-            # Make request to Bedrock
-            response = self.client.invoke_model(
-                modelId=self.config.model_name,
-                body=json.dumps(request_body)
+            # Make request to Bedrock (boto3 blocks, so run it off the event loop)
+            response_body = await asyncio.to_thread(
+                _invoke_model, self.client, self.config.model_name, request_body
             )
-            
-            # Parse response
-            response_body = json.loads(response['body'].read())
             summary = response_body['content'][0]['text']
             
             return summary
             
         except Exception as e:
-            return f"Error creating summary: {str(e)}"
\ No newline at end of file
+            return f"{SUMMARY_ERROR_PREFIX}: {str(e)}"
\ No newline at end of file
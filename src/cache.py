@@ -0,0 +1,92 @@
+"""
+In-process caches for image descriptions and summaries.
+"""
+
+import hashlib
+import mmap
+import os
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+from .config import ModelConfig
+from .interfaces import TextSummarizer, SUMMARY_ERROR_PREFIX
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value for key, marking it as recently used."""
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the oldest entry when full."""
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def sha256_file(path: str) -> str:
+    """Return the hex SHA-256 digest of a file's contents."""
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+
+        # Python < 3.11: hash a read-only mapping to avoid copying the file
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha256(mm).hexdigest()
+
+
+class CachedTextSummarizer(TextSummarizer):
+    """Serve repeated summary requests from memory instead of the model.
+
+    Entries are keyed by model, system prompt and the exact description list,
+    so a configuration change never returns a stale summary. Error summaries
+    are not cached.
+    """
+
+    def __init__(self, summarizer: TextSummarizer, config: ModelConfig, maxsize: int = 256):
+        self.summarizer = summarizer
+        self._cache = LRUCache(maxsize)
+        self._prefix = hashlib.sha256(
+            f"{config.model_name}\0{config.system_prompt}".encode('utf-8')
+        ).digest()
+
+    def _key(self, descriptions: List[str]) -> str:
+        digest = hashlib.sha256(self._prefix)
+        for description in descriptions:
+            digest.update(description.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    async def summarize(self, descriptions: List[str]) -> str:
+        """Return a cached summary, or summarize and remember the result."""
+        key = self._key(descriptions)
+        summary = self._cache.get(key)
+        if summary is None:
+            summary = await self.summarizer.summarize(descriptions)
+            if not summary.startswith(SUMMARY_ERROR_PREFIX):
+                self._cache.set(key, summary)
+        return summary
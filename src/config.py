@@ -2,20 +2,36 @@
 Core configuration management for the Image Summarizer.
 """
 
+import mmap
 import os
+import re
+import sys
 import yaml
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
 
-@dataclass
+
+# Config files at least this large are parsed from a read-only mapping
+_MMAP_THRESHOLD = 64 * 1024
+
+# Slotted dataclasses need Python 3.10+
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(frozen=True, **_SLOTS)
 class ModelConfig:
     """Configuration for a single model."""
     model_name: str
     max_tokens: int
     temperature: float
     system_prompt: str
+    do_sample: bool = False  # Local models: sample with temperature instead of greedy decoding
     
     def __post_init__(self):
         """Validate configuration."""
@@ -25,7 +41,7 @@ class ModelConfig:
             raise ValueError("temperature must be between 0 and 2")
 
 
-@dataclass
+@dataclass(frozen=True)
 class ProviderConfig:
     """Configuration for a provider."""
     image_model: ModelConfig
@@ -33,7 +49,7 @@ class ProviderConfig:
     provider_settings: Dict[str, Any]
 
 
-@dataclass
+@dataclass(frozen=True)
 class Config:
     """Main configuration class."""
     default_provider: str
@@ -46,31 +62,73 @@ class Config:
     text_provider: Optional[str] = None
 
 
+# How each provider names its models, and its default image temperature
+_PROVIDER_SCHEMA = {
+    'bedrock': {'name_key': 'model_id', 'image_temperature': 0.7},
+    'azure_openai': {'name_key': 'deployment_name', 'image_temperature': 0.7},
+    'openai': {'name_key': 'model_name', 'image_temperature': 0.7},
+    'llava': {'name_key': 'model_name', 'image_temperature': 0.8},
+    'falcon': {'name_key': 'model_name', 'image_temperature': 0.7},
+}
+
+_ENV_RE = re.compile(r'\$\{([^}]+)\}')
+
+
 def expand_env_variables(data: Any) -> Any:
     """Recursively expand environment variables in configuration."""
     if isinstance(data, dict):
         return {key: expand_env_variables(value) for key, value in data.items()}
     elif isinstance(data, list):
         return [expand_env_variables(item) for item in data]
-    elif isinstance(data, str) and data.startswith("${") and data.endswith("}"):
-        env_var = data[2:-1]
-        return os.getenv(env_var, data)  # Return original if env var not found
+    elif isinstance(data, str) and '${' in data:
+        # Leave references to unset variables as they are
+        return _ENV_RE.sub(lambda m: os.environ.get(m.group(1), m.group(0)), data)
     else:
         return data
 
 
+# Parsed configurations by resolved path: ((st_mtime_ns, st_size), Config)
+_config_cache: Dict[str, Tuple[Tuple[int, int], Config]] = {}
+
+
 def load_config(config_path: Optional[str] = None) -> Config:
-    """Load configuration from YAML file."""
+    """Load configuration from YAML file.
+    
+    The parsed configuration is cached and reused until the file's
+    modification time or size changes. Config objects are frozen, so callers that
+    need a variant should use dataclasses.replace.
+    """
     if config_path is None:
         config_path = Path(__file__).parent.parent / "config" / "config.yaml"
     else:
         config_path = Path(config_path)
     
-    if not config_path.exists():
-        raise FileNotFoundError(f"Configuration file not found: {config_path}")
+    try:
+        st = config_path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Configuration file not found: {config_path}") from None
     
-    with open(config_path, 'r', encoding='utf-8') as f:
-        raw_config = yaml.safe_load(f)
+    # Size catches rewrites within the filesystem's timestamp granularity
+    cache_key = str(config_path.resolve())
+    version = (st.st_mtime_ns, st.st_size)
+    cached = _config_cache.get(cache_key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    
+    config = _parse_config(config_path)
+    _config_cache[cache_key] = (version, config)
+    return config
+
+
+def _parse_config(config_path: Path) -> Config:
+    """Parse a YAML configuration file into a Config."""
+    # Raw bytes go straight to the parser, which detects the encoding itself
+    with open(config_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= _MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                raw_config = yaml.load(mm, Loader=YamlLoader)
+        else:
+            raw_config = yaml.load(f.read(), Loader=YamlLoader)
     
     # Expand environment variables
     raw_config = expand_env_variables(raw_config)
@@ -78,7 +136,7 @@ def load_config(config_path: Optional[str] = None) -> Config:
     # Build provider configurations
     providers = {}
     
-    for provider_name in ['bedrock', 'azure_openai', 'openai', 'llava', 'falcon']:
+    for provider_name, schema in _PROVIDER_SCHEMA.items():
         if provider_name in raw_config:
             provider_data = raw_config[provider_name]
             
@@ -86,72 +144,20 @@ def load_config(config_path: Optional[str] = None) -> Config:
             image_model_data = provider_data.pop('image_model', {})
             text_model_data = provider_data.pop('text_model', {})
             
-            # Handle different model naming conventions
-            if provider_name == 'bedrock':
-                image_model = ModelConfig(
-                    model_name=image_model_data.get('model_id', ''),
-                    max_tokens=image_model_data.get('max_tokens', 1000),
-                    temperature=image_model_data.get('temperature', 0.7),
-                    system_prompt=image_model_data.get('system_prompt', '')
-                )
-                text_model = ModelConfig(
-                    model_name=text_model_data.get('model_id', ''),
-                    max_tokens=text_model_data.get('max_tokens', 500),
-                    temperature=text_model_data.get('temperature', 0.3),
-                    system_prompt=text_model_data.get('system_prompt', '')
-                )
-            elif provider_name == 'azure_openai':
-                image_model = ModelConfig(
-                    model_name=image_model_data.get('deployment_name', ''),
-                    max_tokens=image_model_data.get('max_tokens', 1000),
-                    temperature=image_model_data.get('temperature', 0.7),
-                    system_prompt=image_model_data.get('system_prompt', '')
-                )
-                text_model = ModelConfig(
-                    model_name=text_model_data.get('deployment_name', ''),
-                    max_tokens=text_model_data.get('max_tokens', 500),
-                    temperature=text_model_data.get('temperature', 0.3),
-                    system_prompt=text_model_data.get('system_prompt', '')
-                )
-            elif provider_name == 'llava':
-                image_model = ModelConfig(
-                    model_name=image_model_data.get('model_name', ''),
-                    max_tokens=image_model_data.get('max_tokens', 1000),
-                    temperature=image_model_data.get('temperature', 0.8),
-                    system_prompt=image_model_data.get('system_prompt', '')
-                )
-                text_model = ModelConfig(
-                    model_name=text_model_data.get('model_name', ''),
-                    max_tokens=text_model_data.get('max_tokens', 500),
-                    temperature=text_model_data.get('temperature', 0.3),
-                    system_prompt=text_model_data.get('system_prompt', '')
-                )
-            elif provider_name == 'falcon':
-                image_model = ModelConfig(
-                    model_name=image_model_data.get('model_name', ''),
-                    max_tokens=image_model_data.get('max_tokens', 1000),
-                    temperature=image_model_data.get('temperature', 0.7),
-                    system_prompt=image_model_data.get('system_prompt', '')
-                )
-                text_model = ModelConfig(
-                    model_name=text_model_data.get('model_name', ''),
-                    max_tokens=text_model_data.get('max_tokens', 500),
-                    temperature=text_model_data.get('temperature', 0.3),
-                    system_prompt=text_model_data.get('system_prompt', '')
-                )
-            else:  # openai
-                image_model = ModelConfig(
-                    model_name=image_model_data.get('model_name', ''),
-                    max_tokens=image_model_data.get('max_tokens', 1000),
-                    temperature=image_model_data.get('temperature', 0.7),
-                    system_prompt=image_model_data.get('system_prompt', '')
-                )
-                text_model = ModelConfig(
-                    model_name=text_model_data.get('model_name', ''),
-                    max_tokens=text_model_data.get('max_tokens', 500),
-                    temperature=text_model_data.get('temperature', 0.3),
-                    system_prompt=text_model_data.get('system_prompt', '')
-                )
+            image_model = ModelConfig(
+                model_name=image_model_data.get(schema['name_key'], ''),
+                max_tokens=image_model_data.get('max_tokens', 1000),
+                temperature=image_model_data.get('temperature', schema['image_temperature']),
+                system_prompt=image_model_data.get('system_prompt', ''),
+                do_sample=image_model_data.get('do_sample', False)
+            )
+            text_model = ModelConfig(
+                model_name=text_model_data.get(schema['name_key'], ''),
+                max_tokens=text_model_data.get('max_tokens', 500),
+                temperature=text_model_data.get('temperature', 0.3),
+                system_prompt=text_model_data.get('system_prompt', ''),
+                do_sample=text_model_data.get('do_sample', False)
+            )
             
             providers[provider_name] = ProviderConfig(
                 image_model=image_model,
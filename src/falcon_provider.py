@@ -3,6 +3,8 @@ Falcon AI integration for image description and text summarization.
 Uses local Hugging Face models via FalconAIModelManager.
 """
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 from pathlib import Path
 from PIL import Image
@@ -14,10 +16,53 @@ try:
 except ImportError:
     TORCH_AVAILABLE = False
 
-from .interfaces import ImageDescriber, TextSummarizer, ImageDescription
+from .interfaces import ImageDescriber, TextSummarizer, ImageDescription, SUMMARY_ERROR_PREFIX
 from .config import ModelConfig
 
 
+def _resolve_dtype(precision: str):
+    """Map the precision setting to a torch dtype.
+    
+    'auto' picks bfloat16 on GPUs that support it and float32 otherwise;
+    float16 is only used when asked for, since T5-based summarizers
+    overflow in it.
+    """
+    if precision == 'auto':
+        if torch.cuda.is_available() and torch.cuda.is_bf16_supported():
+            return torch.bfloat16
+        return torch.float32
+    return {
+        'float32': torch.float32,
+        'float16': torch.float16,
+        'bfloat16': torch.bfloat16
+    }[precision]
+
+
+def _compile_model(model):
+    """Compile the forward passes that generate() actually calls.
+    
+    Compiling the model object itself would not help: pipelines call
+    model.generate(), which goes through the original forward methods.
+    BLIP splits into vision_model and text_decoder, which are compiled
+    separately; other models have their own forward compiled.
+    """
+    submodules = [getattr(model, name) for name in ('vision_model', 'text_decoder') if hasattr(model, name)]
+    for module in submodules or [model]:
+        module.forward = torch.compile(module.forward, dynamic=True)
+
+
+def _input_size(image_pipeline):
+    """(width, height) the pipeline's image processor resizes to, if known."""
+    size = getattr(getattr(image_pipeline, 'image_processor', None), 'size', None)
+    if not isinstance(size, dict):
+        return None
+    width = size.get('width') or size.get('shortest_edge')
+    height = size.get('height') or size.get('shortest_edge')
+    if not width or not height:
+        return None
+    return (width, height)
+
+
 class FalconImageDescriber(ImageDescriber):
     """Image description using Falcon AI models."""
     
@@ -28,16 +73,30 @@ class FalconImageDescriber(ImageDescriber):
         self.config = config
         self.provider_settings = provider_settings
         
+        # One worker: inference is serialized on the model, but kept off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='falcon-vision')
+        # Image decoding is disk/CPU bound and runs in parallel, one batch ahead of inference
+        self._io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='falcon-io')
+        
+        # The model loads on the inference worker, so construction returns at
+        # once and inference queued behind the load simply waits for it
+        self._draft_size = None
+        self._loading = self._executor.submit(self._load_model)
+    
+    def _load_model(self):
+        """Load the captioning pipeline (runs in the executor)."""
         # For image description, we'll use a vision-language model
         # Since Falcon is primarily a text model, we'll use a compatible vision model
         print("Initializing Falcon-compatible image description model...")
+        model_kwargs = {'torch_dtype': _resolve_dtype(self.provider_settings.get('precision', 'auto'))}
         try:
             # Use BLIP model for image captioning (compatible with Falcon workflow)
             model_name = self.config.model_name if self.config.model_name else "Salesforce/blip-image-captioning-base"
             self.model = pipeline(
                 "image-to-text",
                 model=model_name,
-                device="auto" if torch.cuda.is_available() else "cpu"
+                device="auto" if torch.cuda.is_available() else "cpu",
+                model_kwargs=model_kwargs
             )
             print(f"Falcon image description model ready: {model_name}")
         except Exception as e:
@@ -46,65 +105,161 @@ class FalconImageDescriber(ImageDescriber):
             self.model = pipeline(
                 "image-to-text", 
                 model="Salesforce/blip-image-captioning-base",
-                device="auto" if torch.cuda.is_available() else "cpu"
+                device="auto" if torch.cuda.is_available() else "cpu",
+                model_kwargs=model_kwargs
             )
+        self.model.model.eval()
+        if self.provider_settings.get('compile', False):
+            _compile_model(self.model.model)
+        
+        # Input size of the vision model, used to decode large JPEGs at reduced scale
+        self._draft_size = _input_size(self.model)
+    
+    async def _ready(self):
+        """Wait, off the event loop, for the model to finish loading."""
+        await asyncio.wrap_future(self._loading)
     
     def _load_image(self, image_path: str) -> Image.Image:
-        """Load and prepare image for processing."""
-        return Image.open(image_path).convert('RGB')
+        """Load and prepare image for processing.
+        
+        JPEGs are decoded directly at a reduced scale no smaller than the
+        model input, and images that are already RGB are not copied.
+        """
+        image = Image.open(image_path)
+        if self._draft_size:
+            image.draft('RGB', self._draft_size)
+        image.load()
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return image
+    
+    def _try_load_image(self, image_path: str):
+        """Load an image, returning the exception instead of raising it."""
+        try:
+            return self._load_image(image_path)
+        except Exception as e:
+            return e
+    
+    def _caption(self, image_path: str):
+        """Load an image and run the captioning model (runs in the executor)."""
+        image = self._load_image(image_path)
+        with torch.inference_mode():
+            return self.model(image)
+    
+    def _caption_loaded(self, loaded: list) -> list:
+        """Caption already-loaded images in one batched pipeline call (runs in the executor).
+        
+        ``loaded`` holds an image or a load exception per path; exceptions are
+        passed through in place of a result.
+        """
+        images = [item for item in loaded if not isinstance(item, Exception)]
+        
+        if images:
+            with torch.inference_mode():
+                outputs = iter(self.model(images, batch_size=len(images)))
+        
+        return [item if isinstance(item, Exception) else next(outputs) for item in loaded]
+    
+    async def _load_images(self, image_paths: List[str]) -> list:
+        """Load images in parallel on the I/O pool."""
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*(
+            loop.run_in_executor(self._io_pool, self._try_load_image, path)
+            for path in image_paths
+        ))
+    
+    def _to_description(self, image_path: str, result) -> ImageDescription:
+        """Build an ImageDescription from a captioning pipeline result."""
+        if isinstance(result, list) and len(result) > 0:
+            description = result[0].get('generated_text', '')
+        else:
+            description = str(result)
+        
+        return ImageDescription(
+            image_path=image_path,
+            description=description,
+            success=True,
+            metadata={
+                'model_id': 'falcon-compatible-vision',
+                'local_model': True,
+                'base_caption': description
+            }
+        )
+    
+    def _failed(self, image_path: str, error: Exception) -> ImageDescription:
+        """Build a failed ImageDescription for an inference or decode error."""
+        return ImageDescription(
+            image_path=image_path,
+            description="",
+            success=False,
+            error_message=f"Error describing image with Falcon: {str(error)}"
+        )
+    
+    def _not_found(self, image_path: str) -> ImageDescription:
+        """Build a failed ImageDescription for a missing file."""
+        return ImageDescription(
+            image_path=image_path,
+            description="",
+            success=False,
+            error_message=f"Image file not found: {image_path}"
+        )
     
     async def describe_image(self, image_path: str) -> ImageDescription:
         """Describe a single image using Falcon-compatible vision model."""
         try:
             if not Path(image_path).exists():
-                return ImageDescription(
-                    image_path=image_path,
-                    description="",
-                    success=False,
-                    error_message=f"Image file not found: {image_path}"
-                )
-            
-            # Load image
-            image = self._load_image(image_path)
+                return self._not_found(image_path)
             
-            # Generate caption
-            result = self.model(image)
-            
-            # Extract description
-            if isinstance(result, list) and len(result) > 0:
-                description = result[0].get('generated_text', '')
-            else:
-                description = str(result)
+            await self._ready()
             
-            # Enhance the basic caption with the system prompt guidance
-            enhanced_prompt = f"{self.config.system_prompt}\n\nBasic caption: {description}\n\nDetailed description:"
-            
-            return ImageDescription(
-                image_path=image_path,
-                description=description,
-                success=True,
-                metadata={
-                    'model_id': 'falcon-compatible-vision',
-                    'local_model': True,
-                    'base_caption': description
-                }
-            )
+            # Load image and generate caption without blocking the event loop
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, self._caption, image_path)
+            return self._to_description(image_path, result)
             
         except Exception as e:
-            return ImageDescription(
-                image_path=image_path,
-                description="",
-                success=False,
-                error_message=f"Error describing image with Falcon: {str(e)}"
-            )
+            return self._failed(image_path, e)
     
     async def describe_images_batch(self, image_paths: List[str]) -> List[ImageDescription]:
-        """Describe multiple images."""
-        results = []
-        for image_path in image_paths:
-            result = await self.describe_image(image_path)
-            results.append(result)
-        return results
+        """Describe multiple images in batched forward passes.
+        
+        Images are captioned ``batch_size`` at a time; the next group is
+        decoded on the I/O pool while the current one runs on the model.
+        """
+        exists = [Path(path).exists() for path in image_paths]
+        existing = [path for path, found in zip(image_paths, exists) if found]
+        
+        try:
+            await self._ready()
+        except Exception as e:
+            return [
+                self._failed(path, e) if found else self._not_found(path)
+                for path, found in zip(image_paths, exists)
+            ]
+        
+        batch_size = self.provider_settings.get('batch_size', 8)
+        groups = [existing[i:i + batch_size] for i in range(0, len(existing), batch_size)]
+        
+        loop = asyncio.get_running_loop()
+        outputs = []
+        pending = asyncio.ensure_future(self._load_images(groups[0])) if groups else None
+        for i, group in enumerate(groups):
+            loaded = await pending
+            if i + 1 < len(groups):
+                pending = asyncio.ensure_future(self._load_images(groups[i + 1]))
+            try:
+                outputs.extend(await loop.run_in_executor(self._executor, self._caption_loaded, loaded))
+            except Exception as e:
+                outputs.extend([e] * len(group))
+        
+        described = iter(
+            self._failed(path, output) if isinstance(output, Exception) else self._to_description(path, output)
+            for path, output in zip(existing, outputs)
+        )
+        return [
+            next(described) if found else self._not_found(path)
+            for path, found in zip(image_paths, exists)
+        ]
 
 
 class FalconTextSummarizer(TextSummarizer):
@@ -117,25 +272,47 @@ class FalconTextSummarizer(TextSummarizer):
         self.config = config
         self.provider_settings = provider_settings
         
-        # Initialize Falcon AI summarization model
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='falcon-summary')
+        # Loaded on the worker so construction does not block; see FalconImageDescriber
+        self._loading = self._executor.submit(self._load_model)
+    
+    def _load_model(self):
+        """Load the summarization pipeline (runs in the executor)."""
         print("Initializing Falconsai text summarization model...")
+        model_kwargs = {'torch_dtype': _resolve_dtype(self.provider_settings.get('precision', 'auto'))}
         try:
             # Use the specific Falconsai model
-            model_name = config.model_name if config.model_name else "Falconsai/text_summarization"
+            model_name = self.config.model_name if self.config.model_name else "Falconsai/text_summarization"
             self.summarizer = pipeline(
                 "summarization",
                 model=model_name,
-                device="auto" if torch.cuda.is_available() else "cpu"
+                device="auto" if torch.cuda.is_available() else "cpu",
+                model_kwargs=model_kwargs
             )
             print(f"Falconsai summarization model ready: {model_name}")
         except Exception as e:
-            print(f"Warning: Could not load Falconsai model {config.model_name}")
+            print(f"Warning: Could not load Falconsai model {self.config.model_name}")
             print(f"Error: {e}")
             # Create a fallback to the specific Falconsai model
             self.summarizer = pipeline(
                 "summarization",
                 model="Falconsai/text_summarization",
-                device="auto" if torch.cuda.is_available() else "cpu"
+                device="auto" if torch.cuda.is_available() else "cpu",
+                model_kwargs=model_kwargs
+            )
+        
+        self.summarizer.model.eval()
+        if self.provider_settings.get('compile', False):
+            _compile_model(self.summarizer.model)
+    
+    def _summarize(self, text: str):
+        """Run the summarization model (runs in the executor)."""
+        with torch.inference_mode():
+            return self.summarizer(
+                text,
+                max_length=self.config.max_tokens,
+                min_length=50,
+                do_sample=False
             )
     
     async def summarize(self, descriptions: List[str]) -> str:
@@ -152,13 +329,10 @@ class FalconTextSummarizer(TextSummarizer):
             if len(combined_text) > max_input_length:
                 combined_text = combined_text[:max_input_length] + "..."
             
-            # Generate summary using Falcon AI
-            summary_result = self.summarizer(
-                combined_text,
-                max_length=self.config.max_tokens,
-                min_length=50,
-                do_sample=False
-            )
+            # Generate summary using Falcon AI without blocking the event loop
+            await asyncio.wrap_future(self._loading)
+            loop = asyncio.get_running_loop()
+            summary_result = await loop.run_in_executor(self._executor, self._summarize, combined_text)
             
             # Extract summary text
             if isinstance(summary_result, list) and len(summary_result) > 0:
@@ -169,4 +343,4 @@ class FalconTextSummarizer(TextSummarizer):
             return summary
             
         except Exception as e:
-            return f"Error creating summary with Falcon AI: {str(e)}"
\ No newline at end of file
+            return f"{SUMMARY_ERROR_PREFIX} with Falcon AI: {str(e)}"
\ No newline at end of file
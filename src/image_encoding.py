@@ -0,0 +1,165 @@
+"""
+Base64 encoding of image files for the API providers.
+"""
+
+import binascii
+import mmap
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+
+# Media types accepted by the vision APIs, by lower-case file extension
+MEDIA_TYPE_MAP = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp'
+}
+
+# Read size; a multiple of 3 so each chunk encodes without carry-over
+_CHUNK_SIZE = 3 * 64 * 1024
+
+# Files at least this large are encoded straight from a read-only mapping
+_MMAP_THRESHOLD = 8 * 1024 * 1024
+
+_local = threading.local()
+
+# Every EncodeCache, so files can be forgotten everywhere at once
+_caches = weakref.WeakSet()
+
+
+def media_type(image_path: str) -> str:
+    """Media type for an image path, defaulting to JPEG."""
+    return MEDIA_TYPE_MAP.get(os.path.splitext(image_path)[1].lower(), 'image/jpeg')
+
+
+def _chunk_buffer() -> bytearray:
+    """Per-thread read buffer, reused across calls."""
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        buffer = _local.buffer = bytearray(_CHUNK_SIZE)
+    return buffer
+
+
+def _read_chunk(f, view: memoryview) -> int:
+    """Fill view from f, returning fewer bytes only at end of file."""
+    total = 0
+    while total < len(view):
+        n = f.readinto(view[total:])
+        if not n:
+            break
+        total += n
+    return total
+
+
+def _append_base64(encoded: bytearray, position: int, data) -> int:
+    """Encode data into encoded at position, returning the new position."""
+    chunk = binascii.b2a_base64(data, newline=False)
+    encoded[position:position + len(chunk)] = chunk
+    return position + len(chunk)
+
+
+def encode_image(image_path: str, prefix: bytes = b'') -> str:
+    """Encode an image file to base64, optionally after an ASCII prefix.
+
+    The file is encoded chunk by chunk into an output buffer sized up front,
+    so the whole raw file is never held in memory alongside its encoding.
+    Small files are read through a reused fixed-size buffer; large ones are
+    encoded from a read-only mapping without being copied into Python at all.
+    Passing a data URL header as ``prefix`` builds the full URL without
+    another copy of the payload.
+    """
+    with open(image_path, 'rb', buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        encoded = bytearray(len(prefix) + 4 * ((size + 2) // 3))
+        encoded[:len(prefix)] = prefix
+        position = len(prefix)
+
+        if size >= _MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as data:
+                for start in range(0, len(data), _CHUNK_SIZE):
+                    position = _append_base64(encoded, position, data[start:start + _CHUNK_SIZE])
+        else:
+            view = memoryview(_chunk_buffer())
+            while True:
+                n = _read_chunk(f, view)
+                if not n:
+                    break
+                position = _append_base64(encoded, position, view[:n])
+
+    # The file may have changed size since it was opened
+    del encoded[position:]
+    return encoded.decode('ascii')
+
+
+class EncodeCache:
+    """Recently encoded images, bounded by their total size.
+
+    Entries are keyed by path, so a recycled path holds one entry at most,
+    and carry the file's modification time and size, so a replaced file is
+    re-encoded. Safe to share between threads.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def get(self, key, stamp):
+        """Return the encoding stored under key if it was made from stamp."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] != stamp:
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, stamp, encoded: str) -> None:
+        """Store an encoding, evicting the oldest entries over the size bound."""
+        with self._lock:
+            self._drop(key)
+            if len(encoded) > self.max_bytes:
+                return
+            self._data[key] = (stamp, encoded)
+            self._bytes += len(encoded)
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def discard_under(self, directory: str) -> None:
+        """Drop the entries for files inside directory."""
+        prefix = os.path.join(directory, '')
+        with self._lock:
+            for key in [key for key in self._data if key[0].startswith(prefix)]:
+                self._drop(key)
+
+    def _drop(self, key) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def forget_directory(directory) -> None:
+    """Drop cached encodings of files inside directory, e.g. before it is reused."""
+    for cache in list(_caches):
+        cache.discard_under(str(directory))
+
+
+def encode_image_cached(cache: EncodeCache, image_path: str, prefix: bytes = b'') -> str:
+    """Encode an image, reusing an earlier encoding while the file is unchanged."""
+    st = os.stat(image_path)
+    key = (image_path, prefix)
+    stamp = (st.st_mtime_ns, st.st_size)
+    encoded = cache.get(key, stamp)
+    if encoded is None:
+        encoded = encode_image(image_path, prefix)
+        cache.set(key, stamp, encoded)
+    return encoded
@@ -6,8 +6,14 @@ from abc import ABC, abstractmethod
 from typing import List, Optional
 from dataclasses import dataclass
 
+from .config import _SLOTS
 
-@dataclass
+
+# Start of every summary a TextSummarizer returns in place of raising
+SUMMARY_ERROR_PREFIX = "Error creating summary"
+
+
+@dataclass(**_SLOTS)
 class ImageDescription:
     """Represents the description of a single image."""
     image_path: str
@@ -17,7 +23,7 @@ class ImageDescription:
     metadata: Optional[dict] = None
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class SummaryResult:
     """Represents the result of the summarization process."""
     summary: str
@@ -32,6 +38,10 @@ class SummaryResult:
 class ImageDescriber(ABC):
     """Abstract base class for image description services."""
     
+    # Set by describers that submit one offline job per call (e.g. a Batch API
+    # job); the workflow then passes every image in a single batch
+    single_batch = False
+    
     @abstractmethod
     async def describe_image(self, image_path: str) -> ImageDescription:
         """
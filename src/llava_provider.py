@@ -3,23 +3,56 @@ LLaVA (Large Language and Vision Assistant) integration for image description an
 Uses local Hugging Face models for privacy and cost efficiency.
 """
 
+import asyncio
 import base64
+import contextlib
+import threading
 from typing import List
 from pathlib import Path
 from PIL import Image
 
 try:
     import torch
-    from transformers import pipeline
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
     TORCH_AVAILABLE = True
 except ImportError:
     TORCH_AVAILABLE = False
 
-from .interfaces import ImageDescriber, TextSummarizer, ImageDescription
+try:
+    from torchao.quantization import Int8WeightOnlyConfig, quantize_
+    TORCHAO_AVAILABLE = True
+except ImportError:
+    TORCHAO_AVAILABLE = False
+
+from .interfaces import ImageDescriber, TextSummarizer, ImageDescription, SUMMARY_ERROR_PREFIX
 from .config import ModelConfig
 from .rag_model_manager import LLaVaModelManager
 
 
+# LLaVA-NeXT tiles images onto grids of at most 672 pixels a side
+_DRAFT_SIZE = (672, 672)
+
+# Compiled models see prompts padded to a multiple of this many tokens
+_SEQUENCE_BUCKET = 64
+
+
+def _inference_context(device):
+    """inference_mode for generation, plus bf16 autocast when running on CUDA."""
+    stack = contextlib.ExitStack()
+    stack.enter_context(torch.inference_mode())
+    device_type = str(device).split(':')[0]
+    if device_type == 'cuda' and torch.cuda.is_available():
+        stack.enter_context(torch.autocast(device_type=device_type, dtype=torch.bfloat16))
+    return stack
+
+
+def _sampling_kwargs(config: ModelConfig) -> dict:
+    """generate() arguments: greedy decoding unless the config asks to sample."""
+    if config.do_sample:
+        return {'do_sample': True, 'temperature': config.temperature}
+    return {'do_sample': False}
+
+
 class LLaVAImageDescriber(ImageDescriber):
     """Image description using LLaVA local model."""
     
@@ -32,14 +65,104 @@ class LLaVAImageDescriber(ImageDescriber):
         
         # Initialize LLaVA model using the manager
         print("Initializing LLaVA model for image description...")
-        self.model_manager = LLaVaModelManager()
-        self.model = self.model_manager.get_model()
-        self.processor = self.model_manager.get_processor()
-        print("LLaVA model ready for image description.")
+        # The model keeps loading in the background; first use waits for it
+        self.model_manager = LLaVaModelManager(compile_model=provider_settings.get('compile', False))
+        # The instruction prompt is identical for every image, so build it once
+        self.prompt = f"[INST] <image>\n{config.system_prompt}\n\nPlease describe this image in detail. [/INST]"
+        # A compiled model recompiles for every new input shape, so when compiled
+        # every image is resized to one square grid (fixing pixel_values and the
+        # image token count) and prompts are padded to a bucketed length
+        self.static_shapes = provider_settings.get('compile', False)
+        self._warmup_thread = None
+        if self.static_shapes:
+            # Pay the compile cost before the first request, on the exact path
+            # and shapes requests take: image grid, prompt bucket, generation length
+            self._warmup_thread = threading.Thread(target=self._warmup, name="llava-warmup", daemon=True)
+            self._warmup_thread.start()
+        print("LLaVA image describer ready; the model finishes loading in the background.")
+    
+    @property
+    def model(self):
+        return self.model_manager.get_model()
+    
+    @property
+    def processor(self):
+        return self.model_manager.get_processor()
+    
+    @property
+    def device(self):
+        return self.model_manager.get_device()
     
     def _load_image(self, image_path: str) -> Image.Image:
-        """Load and prepare image for processing."""
-        return Image.open(image_path).convert('RGB')
+        """Load and prepare image for processing.
+        
+        JPEGs are decoded directly at a reduced scale no smaller than the
+        largest anyres grid, and images that are already RGB are not copied.
+        """
+        image = Image.open(image_path)
+        image.draft('RGB', _DRAFT_SIZE)
+        image.load()
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        if self.static_shapes and image.size != _DRAFT_SIZE:
+            image = image.resize(_DRAFT_SIZE, Image.BILINEAR)
+        return image
+    
+    def _generate(self, prompts: List[str], images: List[Image.Image], device) -> List[str]:
+        """Run one generate call over a batch of images and return the decoded texts."""
+        padding = {'pad_to_multiple_of': _SEQUENCE_BUCKET} if self.static_shapes else {}
+        inputs = self.processor(text=prompts, images=images, padding=True, return_tensors="pt", **padding)
+        inputs = {k: v.to(device) if hasattr(v, 'to') else v for k, v in inputs.items()}
+        
+        with _inference_context(device):
+            output = self.model.generate(
+                **inputs,
+                max_new_tokens=self.config.max_tokens,
+                **_sampling_kwargs(self.config),
+                pad_token_id=self.processor.tokenizer.eos_token_id
+            )
+        
+        return self.processor.batch_decode(output, skip_special_tokens=True)
+    
+    def _warmup(self):
+        """Run one generate call on a blank image (runs in a thread)."""
+        try:
+            self._generate([self.prompt], [Image.new('RGB', _DRAFT_SIZE)], self.device)
+        except Exception as e:
+            print(f"LLaVA warmup failed: {e}")
+    
+    async def _ready(self):
+        """Wait, off the event loop, for the model to load and finish warming up."""
+        await self.model_manager.wait_ready()
+        if self._warmup_thread is not None and self._warmup_thread.is_alive():
+            await asyncio.to_thread(self._warmup_thread.join)
+    
+    def _to_description(self, image_path: str, generated_text: str, device) -> ImageDescription:
+        """Build an ImageDescription from decoded output, dropping the prompt part."""
+        if "[/INST]" in generated_text:
+            description = generated_text.split("[/INST]")[-1].strip()
+        else:
+            description = generated_text.strip()
+        
+        return ImageDescription(
+            image_path=image_path,
+            description=description,
+            success=True,
+            metadata={
+                'model_id': self.config.model_name,
+                'local_model': True,
+                'device': str(device)
+            }
+        )
+    
+    def _failed(self, image_path: str, error: Exception) -> ImageDescription:
+        """Build a failed ImageDescription for an inference or decode error."""
+        return ImageDescription(
+            image_path=image_path,
+            description="",
+            success=False,
+            error_message=f"Error describing image with LLaVA: {str(error)}"
+        )
     
     async def describe_image(self, image_path: str) -> ImageDescription:
         """Describe a single image using LLaVA."""
@@ -52,68 +175,53 @@ class LLaVAImageDescriber(ImageDescriber):
                     error_message=f"Image file not found: {image_path}"
                 )
             
-            # Load image
-            image = self._load_image(image_path)
+            await self._ready()
             
-            # Prepare the prompt
-            prompt = f"[INST] <image>\n{self.config.system_prompt}\n\nPlease describe this image in detail. [/INST]"
+            # Load image and generate off the event loop, on the same device as the model
+            image = await asyncio.to_thread(self._load_image, image_path)
+            device = self.device
+            generated = await asyncio.to_thread(self._generate, [self.prompt], [image], device)
+            generated_text = generated[0]
             
-            # Process the image and text
-            inputs = self.processor(prompt, image, return_tensors="pt")
-            
-            # Move inputs to the same device as model
-            if hasattr(self.model, 'device'):
-                device = self.model.device
-            else:
-                device = next(self.model.parameters()).device
-            
-            inputs = {k: v.to(device) if hasattr(v, 'to') else v for k, v in inputs.items()}
-            
-            # Generate description
-            with torch.no_grad():
-                output = self.model.generate(
-                    **inputs,
-                    max_new_tokens=self.config.max_tokens,
-                    temperature=self.config.temperature,
-                    do_sample=True,
-                    pad_token_id=self.processor.tokenizer.eos_token_id
-                )
-            
-            # Decode the response
-            generated_text = self.processor.decode(output[0], skip_special_tokens=True)
-            
-            # Extract the description (remove the prompt part)
-            if "[/INST]" in generated_text:
-                description = generated_text.split("[/INST]")[-1].strip()
-            else:
-                description = generated_text.strip()
-            
-            return ImageDescription(
-                image_path=image_path,
-                description=description,
-                success=True,
-                metadata={
-                    'model_id': self.config.model_name,
-                    'local_model': True,
-                    'device': str(device)
-                }
-            )
+            return self._to_description(image_path, generated_text, device)
             
         except Exception as e:
-            return ImageDescription(
-                image_path=image_path,
-                description="",
-                success=False,
-                error_message=f"Error describing image with LLaVA: {str(e)}"
-            )
+            return self._failed(image_path, e)
     
     async def describe_images_batch(self, image_paths: List[str]) -> List[ImageDescription]:
-        """Describe multiple images."""
-        results = []
-        for image_path in image_paths:
-            result = await self.describe_image(image_path)
-            results.append(result)
-        return results
+        """Describe multiple images with a single batched generate call.
+        
+        Falls back to one image at a time if the batch does not fit in GPU memory.
+        """
+        if len(image_paths) <= 1:
+            return [await self.describe_image(path) for path in image_paths]
+        
+        try:
+            images = await asyncio.gather(*(asyncio.to_thread(self._load_image, path) for path in image_paths))
+        except Exception:
+            # Report missing or unreadable files individually
+            return [await self.describe_image(path) for path in image_paths]
+        
+        try:
+            await self._ready()
+        except Exception as e:
+            return [self._failed(path, e) for path in image_paths]
+        
+        device = self.device
+        try:
+            generated = await asyncio.to_thread(
+                self._generate, [self.prompt] * len(images), list(images), device
+            )
+        except torch.cuda.OutOfMemoryError:
+            torch.cuda.empty_cache()
+            return [await self.describe_image(path) for path in image_paths]
+        except Exception as e:
+            return [self._failed(path, e) for path in image_paths]
+        
+        return [
+            self._to_description(path, text, device)
+            for path, text in zip(image_paths, generated)
+        ]
 
 
 class LLaVATextSummarizer(TextSummarizer):
@@ -130,31 +238,36 @@ class LLaVATextSummarizer(TextSummarizer):
         if config.model_name == "llava-hf/llava-v1.6-mistral-7b-hf":
             # Use the same LLaVA model for efficiency
             print("Using existing LLaVA model for text summarization (efficient mode)...")
-            self.model_manager = LLaVaModelManager()
-            self.model = self.model_manager.get_model()
-            self.processor = self.model_manager.get_processor()
+            self.model_manager = LLaVaModelManager(compile_model=provider_settings.get('compile', False))
             self.use_llava = True
-            print("LLaVA model ready for text summarization.")
+            print("LLaVA text summarizer ready; the model finishes loading in the background.")
         else:
             # Use a separate summarization model
             print(f"Loading separate text summarization model: {config.model_name}...")
             try:
-                self.summarizer = pipeline(
-                    "summarization",
-                    model=config.model_name,
-                    device="auto" if torch.cuda.is_available() else "cpu"
-                )
+                self._load_summarization_model(config.model_name)
                 self.use_llava = False
                 print(f"Text summarization model ready: {config.model_name}")
             except Exception as e:
                 print(f"Warning: Could not load {config.model_name}, using BART fallback")
-                self.summarizer = pipeline(
-                    "summarization",
-                    model="facebook/bart-large-cnn",
-                    device="auto" if torch.cuda.is_available() else "cpu"
-                )
+                self._load_summarization_model("facebook/bart-large-cnn")
                 self.use_llava = False
     
+    def _load_summarization_model(self, model_name: str):
+        """Load a seq2seq summarization model with int8 weights."""
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if torch.cuda.is_available():
+            self.device = torch.device("cuda")
+            model = AutoModelForSeq2SeqLM.from_pretrained(model_name, torch_dtype=torch.bfloat16).to(self.device)
+            if TORCHAO_AVAILABLE:
+                quantize_(model, Int8WeightOnlyConfig())
+        else:
+            # Dynamic int8 quantization of the linear layers; CPU only
+            self.device = torch.device("cpu")
+            model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model.eval()
+    
     async def summarize(self, descriptions: List[str]) -> str:
         """Create a summary from descriptions using LLaVA or separate model."""
         try:
@@ -172,20 +285,22 @@ class LLaVATextSummarizer(TextSummarizer):
 
 Summary:"""
                 
-                # Tokenize and generate with LLaVA
-                inputs = self.processor(text=summary_prompt, return_tensors="pt")
+                # Tokenize and generate with LLaVA, once the model has loaded
+                await self.model_manager.wait_ready()
+                model = self.model_manager.get_model()
+                processor = self.model_manager.get_processor()
+                inputs = processor(text=summary_prompt, return_tensors="pt")
                 
-                with torch.no_grad():
-                    generate_ids = self.model.generate(
+                with _inference_context(self.model_manager.get_device()):
+                    generate_ids = model.generate(
                         **inputs,
                         max_new_tokens=min(self.config.max_tokens, 200),
-                        temperature=self.config.temperature,
-                        do_sample=True,
-                        pad_token_id=self.processor.tokenizer.eos_token_id
+                        **_sampling_kwargs(self.config),
+                        pad_token_id=processor.tokenizer.eos_token_id
                     )
                 
                 # Decode the response
-                response = self.processor.batch_decode(
+                response = processor.batch_decode(
                     generate_ids, 
                     skip_special_tokens=True, 
                     clean_up_tokenization_spaces=False
@@ -200,28 +315,24 @@ Summary:"""
                 return summary
                 
             else:
-                # Use separate summarization model (pipeline-based)
+                # Use separate summarization model
                 # Limit text length to avoid model limits
                 max_input_length = 1024  # Conservative limit for most models
                 if len(combined_text) > max_input_length:
                     combined_text = combined_text[:max_input_length] + "..."
                 
-                # Generate summary
-                summary_result = self.summarizer(
-                    combined_text,
-                    max_length=self.config.max_tokens,
-                    min_length=50,
-                    do_sample=False,
-                    temperature=self.config.temperature
-                )
+                inputs = self.tokenizer(combined_text, truncation=True, return_tensors="pt").to(self.device)
                 
-                # Extract summary text
-                if isinstance(summary_result, list) and len(summary_result) > 0:
-                    summary = summary_result[0].get('summary_text', '')
-                else:
-                    summary = str(summary_result)
+                # Generate summary
+                with _inference_context(self.device):
+                    output = self.model.generate(
+                        **inputs,
+                        max_length=self.config.max_tokens,
+                        min_length=50,
+                        do_sample=False
+                    )
                 
-                return summary
+                return self.tokenizer.decode(output[0], skip_special_tokens=True).strip()
             
         except Exception as e:
-            return f"Error creating summary: {str(e)}"
\ No newline at end of file
+            return f"{SUMMARY_ERROR_PREFIX}: {str(e)}"
\ No newline at end of file
@@ -2,18 +2,32 @@
 OpenAI integration for image description and text summarization.
 """
 
-import base64
+import asyncio
+import weakref
 from typing import List
-from pathlib import Path
 
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
 
-from .interfaces import ImageDescriber, TextSummarizer, ImageDescription
+from .interfaces import ImageDescriber, TextSummarizer, ImageDescription, SUMMARY_ERROR_PREFIX
 from .config import ModelConfig
+from .image_encoding import encode_image, media_type
+
+
+def _loop_client(clients: weakref.WeakKeyDictionary, provider_settings: dict):
+    """OpenAI client for the running loop, created on first use.
+
+    The client's connection pool belongs to the loop that opened it, and the
+    providers outlive a single loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = clients.get(loop)
+    if client is None:
+        client = clients[loop] = AsyncOpenAI(api_key=provider_settings.get('api_key'))
+    return client
 
 
 class OpenAIImageDescriber(ImageDescriber):
@@ -26,41 +40,25 @@ class OpenAIImageDescriber(ImageDescriber):
         self.config = config
         self.provider_settings = provider_settings
         
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=provider_settings.get('api_key'))
+        # OpenAI clients, one per event loop (see _loop_client)
+        self._clients = weakref.WeakKeyDictionary()
+    
+    @property
+    def client(self):
+        return _loop_client(self._clients, self.provider_settings)
     
     def _encode_image(self, image_path: str) -> str:
         """Encode image to base64."""
-        with open(image_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+        return encode_image(image_path)
     
     async def describe_image(self, image_path: str) -> ImageDescription:
         """Describe a single image using OpenAI."""
         try:
-            if not Path(image_path).exists():
-                return ImageDescription(
-                    image_path=image_path,
-                    description="",
-                    success=False,
-                    error_message=f"Image file not found: {image_path}"
-                )
-            
-            # Encode image
-            image_base64 = self._encode_image(image_path)
-            image_ext = Path(image_path).suffix.lower()
-            
-            # Determine media type
-            media_type_map = {
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg',
-                '.png': 'image/png',
-                '.gif': 'image/gif',
-                '.webp': 'image/webp'
-            }
-            media_type = media_type_map.get(image_ext, 'image/jpeg')
+            # Encode image; a missing file surfaces as FileNotFoundError
+            image_base64 = await asyncio.to_thread(self._encode_image, image_path)
             
             # Make request to OpenAI
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.config.model_name,
                 messages=[
                     {
@@ -77,7 +75,7 @@ class OpenAIImageDescriber(ImageDescriber):
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:{media_type};base64,{image_base64}"
+                                    "url": f"data:{media_type(image_path)};base64,{image_base64}"
                                 }
                             }
                         ]
@@ -89,16 +87,24 @@ class OpenAIImageDescriber(ImageDescriber):
             
             description = response.choices[0].message.content
             
+            metadata = {'model': self.config.model_name}
+            if response.usage is not None and self.provider_settings.get('track_usage', False):
+                metadata['usage'] = response.usage.model_dump(exclude_none=True)
+            
             return ImageDescription(
                 image_path=image_path,
                 description=description,
                 success=True,
-                metadata={
-                    'model': self.config.model_name,
-                    'usage': response.usage.dict() if response.usage else None
-                }
+                metadata=metadata
             )
             
+        except FileNotFoundError:
+            return ImageDescription(
+                image_path=image_path,
+                description="",
+                success=False,
+                error_message=f"Image file not found: {image_path}"
+            )
         except Exception as e:
             return ImageDescription(
                 image_path=image_path,
@@ -126,8 +132,12 @@ class OpenAITextSummarizer(TextSummarizer):
         self.config = config
         self.provider_settings = provider_settings
         
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=provider_settings.get('api_key'))
+        # OpenAI clients, one per event loop (see _loop_client)
+        self._clients = weakref.WeakKeyDictionary()
+    
+    @property
+    def client(self):
+        return _loop_client(self._clients, self.provider_settings)
     
     async def summarize(self, descriptions: List[str]) -> str:
         """Create a summary from descriptions using OpenAI."""
@@ -139,7 +149,7 @@ class OpenAITextSummarizer(TextSummarizer):
             ])
             
             # Make request to OpenAI
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.config.model_name,
                 messages=[
                     {
@@ -158,4 +168,4 @@ class OpenAITextSummarizer(TextSummarizer):
             return response.choices[0].message.content
             
         except Exception as e:
-            return f"Error creating summary: {str(e)}"
\ No newline at end of file
+            return f"{SUMMARY_ERROR_PREFIX}: {str(e)}"
\ No newline at end of file
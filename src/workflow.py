@@ -3,91 +3,130 @@ Main workflow orchestrator for image summarization.
 """
 
 import asyncio
-from typing import List, Dict, Any
-from pathlib import Path
+import functools
+import os
+from dataclasses import replace
+from typing import List, Dict, Any, AsyncIterator, Tuple
 
-from .config import Config, load_config
+from .batcher import ImageBatcher
+from .cache import CachedTextSummarizer, LRUCache, sha256_file
+from .config import Config, ModelConfig, load_config
 from .interfaces import ImageDescriber, TextSummarizer, SummaryResult, ImageDescription
 
 
+def _settings_key(settings: dict):
+    """Hashable form of provider settings, or None if a value is unhashable."""
+    key = tuple(sorted(settings.items()))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _build_image_describer(provider_name: str, model_config: ModelConfig, settings: dict) -> ImageDescriber:
+    """Construct an image describer for the given provider."""
+    if provider_name == 'bedrock':
+        from .bedrock_provider import BedrockImageDescriber
+        return BedrockImageDescriber(model_config, settings)
+    elif provider_name == 'azure_openai':
+        from .azure_provider import AzureOpenAIImageDescriber
+        return AzureOpenAIImageDescriber(model_config, settings)
+    elif provider_name == 'openai':
+        from .openai_provider import OpenAIImageDescriber
+        return OpenAIImageDescriber(model_config, settings)
+    elif provider_name == 'llava':
+        from .llava_provider import LLaVAImageDescriber
+        return LLaVAImageDescriber(model_config, settings)
+    elif provider_name == 'falcon':
+        from .falcon_provider import FalconImageDescriber
+        return FalconImageDescriber(model_config, settings)
+    else:
+        raise ValueError(f"Unknown provider: {provider_name}")
+
+
+def _build_text_summarizer(provider_name: str, model_config: ModelConfig, settings: dict) -> TextSummarizer:
+    """Construct a text summarizer for the given provider."""
+    if provider_name == 'bedrock':
+        from .bedrock_provider import BedrockTextSummarizer
+        return BedrockTextSummarizer(model_config, settings)
+    elif provider_name == 'azure_openai':
+        from .azure_provider import AzureOpenAITextSummarizer
+        return AzureOpenAITextSummarizer(model_config, settings)
+    elif provider_name == 'openai':
+        from .openai_provider import OpenAITextSummarizer
+        return OpenAITextSummarizer(model_config, settings)
+    elif provider_name == 'llava':
+        from .llava_provider import LLaVATextSummarizer
+        return LLaVATextSummarizer(model_config, settings)
+    elif provider_name == 'falcon':
+        from .falcon_provider import FalconTextSummarizer
+        return FalconTextSummarizer(model_config, settings)
+    else:
+        raise ValueError(f"Unknown provider: {provider_name}")
+
+
+# Providers are shared by every ImageSummarizer built from an equal configuration,
+# and so across event loops: they must create loop-bound clients per running loop
+@functools.lru_cache(maxsize=16)
+def _cached_image_describer(provider_name: str, model_config: ModelConfig, settings_key: tuple) -> ImageDescriber:
+    return _build_image_describer(provider_name, model_config, dict(settings_key))
+
+
+@functools.lru_cache(maxsize=16)
+def _cached_text_summarizer(provider_name: str, model_config: ModelConfig, settings_key: tuple) -> TextSummarizer:
+    return _build_text_summarizer(provider_name, model_config, dict(settings_key))
+
+
 class ProviderFactory:
-    """Factory to create provider instances."""
+    """Factory to create provider instances.
+    
+    Providers are memoized on provider name, model configuration and settings,
+    so rebuilding a workflow from an unchanged configuration reuses them.
+    """
     
     @staticmethod
     def create_image_describer(provider_name: str, config: Config) -> ImageDescriber:
         """Create an image describer for the given provider."""
         provider_config = config.providers[provider_name]
-        
-        if provider_name == 'bedrock':
-            from .bedrock_provider import BedrockImageDescriber
-            return BedrockImageDescriber(
-                provider_config.image_model,
-                provider_config.provider_settings
-            )
-        elif provider_name == 'azure_openai':
-            from .azure_provider import AzureOpenAIImageDescriber
-            return AzureOpenAIImageDescriber(
-                provider_config.image_model,
-                provider_config.provider_settings
+        key = _settings_key(provider_config.provider_settings)
+        if key is None:
+            return _build_image_describer(
+                provider_name, provider_config.image_model, provider_config.provider_settings
             )
-        elif provider_name == 'openai':
-            from .openai_provider import OpenAIImageDescriber
-            return OpenAIImageDescriber(
-                provider_config.image_model,
-                provider_config.provider_settings
-            )
-        elif provider_name == 'llava':
-            from .llava_provider import LLaVAImageDescriber
-            return LLaVAImageDescriber(
-                provider_config.image_model,
-                provider_config.provider_settings
-            )
-        elif provider_name == 'falcon':
-            from .falcon_provider import FalconImageDescriber
-            return FalconImageDescriber(
-                provider_config.image_model,
-                provider_config.provider_settings
-            )
-        else:
-            raise ValueError(f"Unknown provider: {provider_name}")
+        return _cached_image_describer(provider_name, provider_config.image_model, key)
     
     @staticmethod
     def create_text_summarizer(provider_name: str, config: Config) -> TextSummarizer:
-        """Create a text summarizer for the given provider."""
+        """Create a text summarizer for the given provider, fronted by a summary cache."""
         provider_config = config.providers[provider_name]
-        
-        if provider_name == 'bedrock':
-            from .bedrock_provider import BedrockTextSummarizer
-            return BedrockTextSummarizer(
-                provider_config.text_model,
-                provider_config.provider_settings
-            )
-        elif provider_name == 'azure_openai':
-            from .azure_provider import AzureOpenAITextSummarizer
-            return AzureOpenAITextSummarizer(
-                provider_config.text_model,
-                provider_config.provider_settings
-            )
-        elif provider_name == 'openai':
-            from .openai_provider import OpenAITextSummarizer
-            return OpenAITextSummarizer(
-                provider_config.text_model,
-                provider_config.provider_settings
-            )
-        elif provider_name == 'llava':
-            from .llava_provider import LLaVATextSummarizer
-            return LLaVATextSummarizer(
-                provider_config.text_model,
-                provider_config.provider_settings
-            )
-        elif provider_name == 'falcon':
-            from .falcon_provider import FalconTextSummarizer
-            return FalconTextSummarizer(
-                provider_config.text_model,
-                provider_config.provider_settings
+        key = _settings_key(provider_config.provider_settings)
+        if key is None:
+            summarizer = _build_text_summarizer(
+                provider_name, provider_config.text_model, provider_config.provider_settings
             )
         else:
-            raise ValueError(f"Unknown provider: {provider_name}")
+            summarizer = _cached_text_summarizer(provider_name, provider_config.text_model, key)
+        
+        return CachedTextSummarizer(
+            summarizer,
+            provider_config.text_model,
+            maxsize=config.workflow.get('cache_size', 256)
+        )
+
+
+# Below this many paths a thread hop costs more than the stat calls it overlaps
+_INLINE_STAT_LIMIT = 16
+
+
+async def _paths_exist(image_paths: List[str]) -> List[bool]:
+    """Check which paths exist, overlapping the stat calls in worker threads.
+    
+    Short lists are checked inline in a single pass, without scheduling any tasks.
+    """
+    if len(image_paths) <= _INLINE_STAT_LIMIT:
+        return [os.path.exists(path) for path in image_paths]
+    return await asyncio.gather(*(asyncio.to_thread(os.path.exists, path) for path in image_paths))
 
 
 class ImageSummarizer:
@@ -112,6 +151,96 @@ class ImageSummarizer:
         self.text_summarizer = ProviderFactory.create_text_summarizer(
             self.provider_name, config
         )
+        
+        # Content-addressed cache so re-submitted images skip inference
+        self._description_cache = LRUCache(config.workflow.get('cache_size', 256))
+        
+        # Optional cross-request batcher, enabled by long-running servers
+        self._batcher = None
+    
+    def enable_batching(self, max_items: int = None, max_wait_ms: float = 50):
+        """Coalesce images from concurrent process_images calls into shared batches."""
+        self._batcher = ImageBatcher(
+            self.image_describer.describe_images_batch,
+            max_items=max_items or self.config.workflow.get('batch_size', 3),
+            max_wait_ms=max_wait_ms,
+            max_concurrent=self.config.workflow.get('max_concurrent_requests')
+        )
+    
+    async def iter_descriptions(self, image_paths: List[str]) -> AsyncIterator[ImageDescription]:
+        """Yield a description for each image as soon as it is available.
+        
+        Missing files are reported first, as failed descriptions.
+        """
+        valid_paths = []
+        for path, exists in zip(image_paths, await _paths_exist(image_paths)):
+            if exists:
+                valid_paths.append(path)
+            else:
+                yield ImageDescription(
+                    image_path=path,
+                    description="",
+                    success=False,
+                    error_message=f"Image file not found: {path}"
+                )
+        
+        async for result, _ in self._describe(valid_paths):
+            yield result
+    
+    async def summarize_descriptions(self, descriptions: List[ImageDescription]) -> str:
+        """Summarize successful descriptions."""
+        return await self.text_summarizer.summarize([desc.description for desc in descriptions])
+    
+    async def _describe(self, image_paths: List[str]) -> AsyncIterator[Tuple[ImageDescription, bool]]:
+        """Describe existing images, yielding (description, from_cache) as results arrive."""
+        # Reuse cached descriptions for images we have already seen
+        digests = await asyncio.gather(*(asyncio.to_thread(sha256_file, path) for path in image_paths))
+        path_hashes = dict(zip(image_paths, digests))
+        duplicates = {}
+        to_describe = []
+        
+        for path in image_paths:
+            digest = path_hashes[path]
+            cached = self._description_cache.get(digest)
+            if cached is not None:
+                yield replace(cached, image_path=path), True
+            elif digest in duplicates:
+                # Same content as an image already queued in this call
+                duplicates[digest].append(path)
+            else:
+                duplicates[digest] = []
+                to_describe.append(path)
+        
+        async for result in self._describe_uncached(to_describe):
+            digest = path_hashes[result.image_path]
+            if result.success:
+                self._description_cache.set(digest, result)
+            
+            yield result, False
+            for path in duplicates[digest]:
+                yield replace(result, image_path=path), False
+    
+    async def _describe_uncached(self, image_paths: List[str]) -> AsyncIterator[ImageDescription]:
+        """Run the image describer, yielding results batch by batch as they finish."""
+        if self._batcher is not None:
+            for next_result in asyncio.as_completed([self._batcher.add(path) for path in image_paths]):
+                yield await next_result
+            return
+        
+        # Run batches concurrently, at most max_concurrent_requests at a time
+        batch_size = self.config.workflow.get('batch_size', 3)
+        if getattr(self.image_describer, 'single_batch', False):
+            batch_size = max(len(image_paths), 1)
+        batches = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+        semaphore = asyncio.Semaphore(self.config.workflow.get('max_concurrent_requests') or len(batches) or 1)
+        
+        async def describe(batch: List[str]) -> List[ImageDescription]:
+            async with semaphore:
+                return await self.image_describer.describe_images_batch(batch)
+        
+        for next_batch in asyncio.as_completed([describe(batch) for batch in batches]):
+            for result in await next_batch:
+                yield result
     
     async def process_images(self, image_paths: List[str]) -> SummaryResult:
         """Process a list of images and create a summary."""
@@ -120,8 +249,8 @@ class ImageSummarizer:
             valid_paths = []
             invalid_paths = []
             
-            for path in image_paths:
-                if Path(path).exists():
+            for path, exists in zip(image_paths, await _paths_exist(image_paths)):
+                if exists:
                     valid_paths.append(path)
                 else:
                     invalid_paths.append(path)
@@ -136,25 +265,28 @@ class ImageSummarizer:
                     error_message="No valid image files found"
                 )
             
-            # Process images in batches
             batch_size = self.config.workflow.get('batch_size', 3)
+            described = {}
+            cache_hits = 0
+            
+            async for result, from_cache in self._describe(valid_paths):
+                described[result.image_path] = result
+                if from_cache:
+                    cache_hits += 1
+            
             all_descriptions = []
             failed_images = list(invalid_paths)
             
-            for i in range(0, len(valid_paths), batch_size):
-                batch = valid_paths[i:i + batch_size]
-                batch_results = await self.image_describer.describe_images_batch(batch)
-                
-                for result in batch_results:
-                    if result.success:
-                        all_descriptions.append(result)
-                    else:
-                        failed_images.append(result.image_path)
+            for path in valid_paths:
+                result = described[path]
+                if result.success:
+                    all_descriptions.append(result)
+                else:
+                    failed_images.append(path)
             
             # Create summary if we have successful descriptions
             if all_descriptions:
-                description_texts = [desc.description for desc in all_descriptions]
-                summary = await self.text_summarizer.summarize(description_texts)
+                summary = await self.summarize_descriptions(all_descriptions)
             else:
                 summary = "No images could be processed successfully."
             
@@ -166,7 +298,8 @@ class ImageSummarizer:
                 failed_images=failed_images,
                 metadata={
                     'provider': self.provider_name,
-                    'batch_size': batch_size
+                    'batch_size': batch_size,
+                    'cache_hits': cache_hits
                 }
             )
             
@@ -5,17 +5,35 @@ Test configuration and fixtures.
 import pytest
 from pathlib import Path
 from PIL import Image
-import tempfile
 import os
 
 from image_summarizer.config import Config, ModelConfig, WorkflowConfig
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        '--no-xdist',
+        action='store_true',
+        help='Run tests in a single process even when pytest-xdist is installed'
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_cmdline_main(config):
+    """Spread test modules over all CPUs by default when pytest-xdist is installed."""
+    if not config.pluginmanager.hasplugin('xdist') or hasattr(config, 'workerinput'):
+        return
+    if config.getoption('--no-xdist') or config.getoption('usepdb'):
+        return
+    if config.getoption('numprocesses', None) is None and config.getoption('dist', 'no') == 'no':
+        config.option.numprocesses = 'auto'
+        config.option.dist = 'loadfile'
+
+
 @pytest.fixture
-def temp_dir():
+def temp_dir(tmp_path):
     """Create a temporary directory for test files."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        yield tmpdir
+    return str(tmp_path)
 
 
 @pytest.fixture
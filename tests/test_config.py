@@ -6,6 +6,7 @@ import pytest
 import tempfile
 import os
 import yaml
+from pathlib import Path
 
 from image_summarizer.config import Config, ModelConfig, WorkflowConfig, load_config, create_example_config
 
@@ -74,8 +75,7 @@ def test_load_config_from_file(temp_dir):
     }
     
     config_path = os.path.join(temp_dir, "test_config.yaml")
-    with open(config_path, 'w') as f:
-        yaml.dump(config_data, f)
+    Path(config_path).write_text(yaml.dump(config_data, Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper)))
     
     config = load_config(config_path)
     
@@ -3,23 +3,22 @@ Test the simplified workflow and interfaces.
 """
 
 import pytest
-import tempfile
 import os
 from pathlib import Path
 import sys
 import asyncio
 
+import yaml
+
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
 from src.workflow import ImageSummarizer
-from src.config import load_config
+from src.config import load_config, expand_env_variables
 from src.interfaces import ImageDescription, SummaryResult
 
 
-def test_workflow_creation():
-    """Test workflow can be created with valid configuration."""
-    config_content = """
+BEDROCK_CONFIG = """
 default_provider: "bedrock"
 
 workflow:
@@ -53,29 +52,50 @@ output:
 logging:
   level: "INFO"
 """
+
+
+@pytest.fixture(scope='module')
+def bedrock_config_path(tmp_path_factory):
+    """Bedrock configuration file shared by the tests in this module."""
+    path = tmp_path_factory.mktemp('config') / 'bedrock.yaml'
+    path.write_text(BEDROCK_CONFIG)
+    return str(path)
+
+
+def write_bedrock_config(directory, **workflow):
+    """Write BEDROCK_CONFIG to directory with the given workflow settings overridden."""
+    config = yaml.safe_load(BEDROCK_CONFIG)
+    config['workflow'].update(workflow)
+    path = directory / 'config.yaml'
+    path.write_text(yaml.safe_dump(config))
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def shared_loop():
+    """One event loop for every async test in this module."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(loop.shutdown_default_executor())
+    loop.close()
+
+
+def test_workflow_creation(bedrock_config_path):
+    """Test workflow can be created with valid configuration."""
+    config = load_config(bedrock_config_path)
     
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-        f.write(config_content)
-        config_path = f.name
-    
+    # This will fail if boto3 is not installed, which is expected
     try:
-        config = load_config(config_path)
+        summarizer = ImageSummarizer(config)
+        info = summarizer.get_info()
+        
+        assert info['provider'] == 'bedrock'
+        assert 'image_model' in info
+        assert 'text_model' in info
         
-        # This will fail if boto3 is not installed, which is expected
-        try:
-            summarizer = ImageSummarizer(config)
-            info = summarizer.get_info()
-            
-            assert info['provider'] == 'bedrock'
-            assert 'image_model' in info
-            assert 'text_model' in info
-            
-        except ImportError:
-            # Expected when boto3 is not installed
-            pytest.skip("boto3 not available for testing")
-            
-    finally:
-        os.unlink(config_path)
+    except ImportError:
+        # Expected when boto3 is not installed
+        pytest.skip("boto3 not available for testing")
 
 
 def test_image_description_dataclass():
@@ -114,59 +134,357 @@ def test_summary_result_dataclass():
     assert len(result.failed_images) == 0
 
 
-def test_nonexistent_image_handling():
+def test_nonexistent_image_handling(bedrock_config_path, shared_loop):
     """Test handling of nonexistent image files."""
-    config_content = """
-default_provider: "bedrock"
+    try:
+        summarizer = ImageSummarizer(load_config(bedrock_config_path))
+    except ImportError:
+        pytest.skip("Required provider dependencies not available")
+    
+    # Test with nonexistent files
+    result = shared_loop.run_until_complete(summarizer.process_images([
+        "/nonexistent/file1.jpg",
+        "/nonexistent/file2.png"
+    ]))
+    
+    assert result.total_images == 2
+    assert result.successful_descriptions == 0
+    assert len(result.failed_images) == 2
+    assert result.summary == "No valid images found to process."
 
-workflow:
-  batch_size: 1
 
-bedrock:
-  aws_region: "us-east-1"
-  image_model:
-    model_id: "test-model"
-    max_tokens: 100
-    temperature: 0.7
-    system_prompt: "Test"
-  text_model:
-    model_id: "test-model" 
-    max_tokens: 100
-    temperature: 0.3
-    system_prompt: "Test"
-"""
+def test_repeated_image_uses_description_cache(tmp_path, bedrock_config_path, shared_loop):
+    """Test that re-submitted image content is served from the cache."""
+    first = tmp_path / "first.jpg"
+    second = tmp_path / "second.jpg"
+    first.write_bytes(b"same image bytes")
+    second.write_bytes(b"same image bytes")
+    
+    class CountingDescriber:
+        def __init__(self):
+            self.calls = []
+        
+        async def describe_images_batch(self, image_paths):
+            self.calls.extend(image_paths)
+            return [ImageDescription(path, "A description", True) for path in image_paths]
     
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-        f.write(config_content)
-        config_path = f.name
+    class CountingSummarizer:
+        def __init__(self):
+            self.calls = 0
+        
+        async def summarize(self, descriptions):
+            self.calls += 1
+            return "Summary"
+    
+    try:
+        summarizer = ImageSummarizer(load_config(bedrock_config_path))
+    except ImportError:
+        pytest.skip("Required provider dependencies not available")
+    
+    summarizer.image_describer = CountingDescriber()
+    summarizer.text_summarizer = CountingSummarizer()
+    
+    async def run_twice():
+        first_result = await summarizer.process_images([str(first), str(second)])
+        second_result = await summarizer.process_images([str(second)])
+        return first_result, second_result
+    
+    first_result, second_result = shared_loop.run_until_complete(run_twice())
+    
+    # Identical content is only described once, even across requests
+    assert summarizer.image_describer.calls == [str(first)]
+    assert [d.image_path for d in first_result.descriptions] == [str(first), str(second)]
+    assert second_result.descriptions[0].image_path == str(second)
+    assert second_result.metadata['cache_hits'] == 1
+
+
+def test_image_batcher_coalesces_concurrent_requests(shared_loop):
+    """Test that images from concurrent callers share one describe call."""
+    from src.batcher import ImageBatcher
+    
+    calls = []
+    
+    async def describe(image_paths):
+        calls.append(list(image_paths))
+        return [ImageDescription(path, f"Description of {path}", True) for path in image_paths]
+    
+    async def run():
+        batcher = ImageBatcher(describe, max_items=4, max_wait_ms=10)
+        first, second = await asyncio.gather(
+            asyncio.gather(batcher.add("a.jpg"), batcher.add("b.jpg")),
+            asyncio.gather(batcher.add("c.jpg"))
+        )
+        return first, second
+    
+    first, second = shared_loop.run_until_complete(run())
+    
+    assert calls == [["a.jpg", "b.jpg", "c.jpg"]]
+    assert [d.image_path for d in first] == ["a.jpg", "b.jpg"]
+    assert second[0].description == "Description of c.jpg"
+
+
+def test_image_batcher_fails_callers_missing_from_results(shared_loop):
+    """Test that callers left out of a short batch result get an error instead of hanging."""
+    from src.batcher import ImageBatcher
+    
+    async def describe(image_paths):
+        return [ImageDescription(image_paths[0], "Only the first", True)]
+    
+    async def run():
+        batcher = ImageBatcher(describe, max_items=2, max_wait_ms=10)
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.add("a.jpg"), batcher.add("b.jpg"), return_exceptions=True),
+            timeout=1
+        )
     
+    first, second = shared_loop.run_until_complete(run())
+    
+    assert first.description == "Only the first"
+    assert isinstance(second, RuntimeError)
+
+
+def test_bedrock_batch_describes_images_concurrently(shared_loop):
+    """Test that batch description overlaps calls up to max_concurrency."""
     try:
-        config = load_config(config_path)
+        from src.bedrock_provider import BedrockImageDescriber
+        from src.config import ModelConfig
         
-        try:
-            summarizer = ImageSummarizer(config)
-            
-            # Test with nonexistent files
-            async def test_nonexistent():
-                result = await summarizer.process_images([
-                    "/nonexistent/file1.jpg",
-                    "/nonexistent/file2.png"
-                ])
-                
-                assert result.total_images == 2
-                assert result.successful_descriptions == 0
-                assert len(result.failed_images) == 2
-                assert result.summary == "No valid images found to process."
-                
-            # Run async test
-            asyncio.run(test_nonexistent())
-            
-        except ImportError:
-            pytest.skip("Required provider dependencies not available")
-            
-    finally:
-        os.unlink(config_path)
+        describer = BedrockImageDescriber(
+            ModelConfig("test-model", 100, 0.7, "Test"),
+            {'aws_region': 'us-east-1', 'max_concurrency': 2}
+        )
+    except ImportError:
+        pytest.skip("boto3 not available for testing")
+    
+    in_flight = 0
+    peak = 0
+    
+    async def fake_describe(image_path):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return ImageDescription(image_path, f"Description of {image_path}", True)
+    
+    describer.describe_image = fake_describe
+    paths = [f"img{i}.jpg" for i in range(5)]
+    results = shared_loop.run_until_complete(describer.describe_images_batch(paths))
+    
+    assert [d.image_path for d in results] == paths
+    assert peak == 2
 
 
+@pytest.fixture
+def loop_bound_openai(monkeypatch):
+    """Replace AsyncOpenAI with a stub that, like the real client, only works on its own loop."""
+    from types import SimpleNamespace
+    from src import openai_provider
+    
+    class LoopBoundClient:
+        def __init__(self, api_key=None):
+            self.loop = asyncio.get_running_loop()
+            self.chat = SimpleNamespace(completions=self)
+        
+        async def create(self, **kwargs):
+            if asyncio.get_running_loop() is not self.loop:
+                raise RuntimeError("Event loop is closed")
+            message = SimpleNamespace(content="A description")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+    
+    monkeypatch.setattr(openai_provider, 'AsyncOpenAI', LoopBoundClient, raising=False)
+    monkeypatch.setattr(openai_provider, 'OPENAI_AVAILABLE', True)
+
+
+def test_openai_describer_survives_a_new_event_loop(tmp_path, loop_bound_openai):
+    """Test that a describer reused by a second asyncio.run gets a client for that loop."""
+    from src.openai_provider import OpenAIImageDescriber
+    from src.config import ModelConfig
+    
+    image_path = tmp_path / "image.png"
+    image_path.write_bytes(b"\x89PNG\r\n\x1a\n")
+    
+    describer = OpenAIImageDescriber(ModelConfig("gpt-4o", 100, 0.7, "Describe"), {'api_key': 'test-key'})
+    first = asyncio.run(describer.describe_image(str(image_path)))
+    second = asyncio.run(describer.describe_image(str(image_path)))
+    
+    assert first.success, first.error_message
+    assert second.success, second.error_message
+
+
+def test_workflows_sharing_providers_run_on_separate_loops(tmp_path, loop_bound_openai):
+    """Test that two workflows built from one config, sharing memoized providers, both succeed."""
+    config_path = str(Path(__file__).parent.parent / 'config_test.yaml')
+    image_path = tmp_path / "image.png"
+    image_path.write_bytes(b"\x89PNG\r\n\x1a\n")
+    
+    first = ImageSummarizer(config_path=config_path)
+    second = ImageSummarizer(config_path=config_path)
+    assert first.image_describer is second.image_describer
+    
+    first_result = asyncio.run(first.process_images([str(image_path)]))
+    second_result = asyncio.run(second.process_images([str(image_path)]))
+    
+    assert first_result.successful_descriptions == 1
+    assert second_result.successful_descriptions == 1
+    assert second_result.summary == "A description"
+
+
+def test_cached_text_summarizer_reuses_identical_requests(shared_loop):
+    """Test that an identical description list is only summarized once."""
+    from src.cache import CachedTextSummarizer
+    from src.config import ModelConfig
+    
+    class CountingSummarizer:
+        def __init__(self):
+            self.calls = 0
+        
+        async def summarize(self, descriptions):
+            self.calls += 1
+            return f"Summary {self.calls}"
+    
+    inner = CountingSummarizer()
+    summarizer = CachedTextSummarizer(inner, ModelConfig("test-model", 100, 0.3, "Test"))
+    
+    async def run():
+        return [
+            await summarizer.summarize(["a", "b"]),
+            await summarizer.summarize(["a", "b"]),
+            await summarizer.summarize(["ab"])
+        ]
+    
+    assert shared_loop.run_until_complete(run()) == ["Summary 1", "Summary 1", "Summary 2"]
+    assert inner.calls == 2
+
+
+def test_cached_text_summarizer_skips_error_summaries(shared_loop):
+    """Test that summaries starting with the shared error prefix are never cached."""
+    from src.cache import CachedTextSummarizer
+    from src.config import ModelConfig
+    from src.interfaces import SUMMARY_ERROR_PREFIX
+    
+    class FailingSummarizer:
+        def __init__(self):
+            self.calls = 0
+        
+        async def summarize(self, descriptions):
+            self.calls += 1
+            return f"{SUMMARY_ERROR_PREFIX} with Falcon AI: out of memory"
+    
+    inner = FailingSummarizer()
+    summarizer = CachedTextSummarizer(inner, ModelConfig("test-model", 100, 0.3, "Test"))
+    
+    async def run():
+        await summarizer.summarize(["a"])
+        await summarizer.summarize(["a"])
+    
+    shared_loop.run_until_complete(run())
+    assert inner.calls == 2
+
+
+def test_expand_env_variables_inline(monkeypatch):
+    """Test that variables are expanded inside larger strings."""
+    monkeypatch.setenv("REGION", "eu-west-1")
+    monkeypatch.delenv("UNSET_VARIABLE", raising=False)
+    
+    expanded = expand_env_variables({
+        'host': "host-${REGION}.svc",
+        'items': ["${REGION}", "${UNSET_VARIABLE}", 3]
+    })
+    
+    assert expanded == {
+        'host': "host-eu-west-1.svc",
+        'items': ["eu-west-1", "${UNSET_VARIABLE}", 3]
+    }
+
+
+def test_load_config_reloads_rewritten_file(tmp_path):
+    """Test that a rewrite is picked up even when the mtime is unchanged."""
+    config_path = write_bedrock_config(tmp_path, batch_size=1)
+    first = load_config(config_path)
+    assert load_config(config_path) is first
+    
+    mtime_ns = os.stat(config_path).st_mtime_ns
+    write_bedrock_config(tmp_path, batch_size=12)
+    os.utime(config_path, ns=(mtime_ns, mtime_ns))
+    
+    assert load_config(config_path).workflow['batch_size'] == 12
+
+
+def test_process_images_runs_batches_concurrently(tmp_path, shared_loop):
+    """Test that batches overlap, bounded by max_concurrent_requests."""
+    config_path = write_bedrock_config(tmp_path, batch_size=1, max_concurrent_requests=2, cache_size=0)
+    
+    paths = []
+    for i in range(4):
+        image = tmp_path / f"img{i}.jpg"
+        image.write_bytes(f"image {i}".encode())
+        paths.append(str(image))
+    
+    class SlowDescriber:
+        def __init__(self):
+            self.in_flight = 0
+            self.peak = 0
+        
+        async def describe_images_batch(self, image_paths):
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            return [ImageDescription(path, f"Description of {path}", True) for path in image_paths]
+    
+    class StaticSummarizer:
+        async def summarize(self, descriptions):
+            return "Summary"
+    
+    try:
+        summarizer = ImageSummarizer(load_config(config_path))
+    except ImportError:
+        pytest.skip("Required provider dependencies not available")
+    
+    summarizer.image_describer = SlowDescriber()
+    summarizer.text_summarizer = StaticSummarizer()
+    
+    result = shared_loop.run_until_complete(summarizer.process_images(paths))
+    
+    assert summarizer.image_describer.peak == 2
+    assert [d.image_path for d in result.descriptions] == paths
+
+
+def test_single_batch_describer_gets_every_image_at_once(tmp_path, bedrock_config_path, shared_loop):
+    """Test that an offline describer receives one batch instead of batch_size chunks."""
+    paths = []
+    for i in range(5):
+        image = tmp_path / f"img{i}.jpg"
+        image.write_bytes(f"image {i}".encode())
+        paths.append(str(image))
+    
+    class OfflineDescriber:
+        single_batch = True
+        
+        def __init__(self):
+            self.calls = []
+        
+        async def describe_images_batch(self, image_paths):
+            self.calls.append(list(image_paths))
+            return [ImageDescription(path, f"Description of {path}", True) for path in image_paths]
+    
+    class StaticSummarizer:
+        async def summarize(self, descriptions):
+            return "Summary"
+    
+    try:
+        summarizer = ImageSummarizer(load_config(bedrock_config_path))
+    except ImportError:
+        pytest.skip("Required provider dependencies not available")
+    
+    summarizer.image_describer = OfflineDescriber()
+    summarizer.text_summarizer = StaticSummarizer()
+    
+    result = shared_loop.run_until_complete(summarizer.process_images(paths))
+    
+    assert summarizer.image_describer.calls == [paths]
+    assert result.successful_descriptions == 5
+
 if __name__ == '__main__':
     pytest.main([__file__])
\ No newline at end of file